@@ -0,0 +1,25 @@
+# gunicorn.conf.py
+# gunicorn ocr_project.wsgi  (run from this directory to pick up the file)
+import gc
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("GUNICORN_WORKERS", 4))
+timeout = 120
+
+# Import the app, the ML stack and every disease model once in the master.
+# Workers are forked from it and share those pages copy-on-write; the model
+# weights are memory-mapped .npy files, so they stay shared for good.
+preload_app = True
+
+
+def when_ready(server):
+    from ocr_app.services.model_store import preload_release
+    from ocr_app.services.symptom_ranker import get_symptom_ranker
+
+    release = preload_release()
+    get_symptom_ranker()
+    server.log.info("Preloaded model release %s: %s", release.version, release.models.memory_stats())
+
+    # Keep the collector from touching (and so copying) the preloaded objects
+    gc.freeze()
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Disease, Symptom, Medicine
+from .models import Disease, Symptom, Medicine, OcrJob, SideEffectLabel
 from django.contrib import admin
 
 
@@ -8,3 +8,5 @@ from django.contrib import admin
 admin.site.register(Disease)
 admin.site.register(Symptom)
 admin.site.register(Medicine)
+admin.site.register(OcrJob)
+admin.site.register(SideEffectLabel)
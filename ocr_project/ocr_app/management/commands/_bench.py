@@ -0,0 +1,29 @@
+# Shared by the bench_* commands (the leading underscore keeps it from
+# being listed as a command itself)
+import os
+import sys
+import subprocess
+from django.conf import settings
+from django.core.management.base import CommandError
+
+SETUP = (
+    "import os, django\n"
+    "os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ocr_project.settings')\n"
+    "django.setup()\n"
+)
+
+
+def run_snippet(snippet, *args, flags=()):
+    """
+    Run `snippet` in a fresh interpreter, after django.setup(), from the
+    project directory, with `args` in sys.argv[1:] and `flags` passed to
+    python itself. Returns the CompletedProcess; raises CommandError with
+    the last line of stderr when the snippet fails.
+    """
+    out = subprocess.run(
+        [sys.executable, *flags, "-c", SETUP + snippet, *map(str, args)],
+        cwd=str(settings.BASE_DIR), capture_output=True, text=True, env=os.environ.copy()
+    )
+    if out.returncode != 0:
+        raise CommandError(out.stderr.strip().splitlines()[-1])
+    return out
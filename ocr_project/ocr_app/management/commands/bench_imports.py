@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand, CommandError
+import re
+import statistics
+from ._bench import run_snippet
+
+# Modules that should only load on the code path that needs them
+HEAVY_MODULES = [
+    "numpy", "pandas", "sklearn", "scipy", "matplotlib",
+    "reportlab", "pytesseract", "pdf2image", "PIL",
+]
+
+IMPORTTIME_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+class Command(BaseCommand):
+    help = 'Import-time report (python -X importtime) for the views and url modules'
+
+    def add_arguments(self, parser):
+        parser.add_argument('modules', nargs='*', default=['ocr_app.views', 'ocr_project.urls'])
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--top', type=int, default=10, help='Slowest modules to list')
+        parser.add_argument('--budget-ms', type=float, help='Fail if a module imports slower than this')
+        parser.add_argument('--allow-heavy', action='store_true',
+                            help="Don't fail when a heavy dependency is imported eagerly")
+
+    def importtime(self, module):
+        """{module: (self µs, cumulative µs)} for one fresh interpreter importing `module`."""
+        out = run_snippet(f"import {module}\n", flags=("-X", "importtime"))
+
+        times = {}
+        for line in out.stderr.splitlines():
+            match = IMPORTTIME_RE.match(line)
+            if match:
+                times[match.group(4)] = (int(match.group(1)), int(match.group(2)))
+        return times
+
+    def handle(self, *args, **options):
+        failures = []
+
+        for module in options['modules']:
+            runs = [self.importtime(module) for _ in range(options['repeat'])]
+            if module not in runs[0]:
+                self.stdout.write(f'⏭️  {module}: already imported by django.setup()')
+                continue
+
+            cumulative = statistics.median(run[module][1] for run in runs) / 1000
+            self.stdout.write(f'✅ {module}: median {cumulative:.1f} ms ({len(runs)} runs)')
+
+            slowest = sorted(runs[0].items(), key=lambda item: item[1][0], reverse=True)[:options['top']]
+            for name, (self_us, cumulative_us) in slowest:
+                self.stdout.write(f'    {self_us / 1000:7.1f} ms self  {cumulative_us / 1000:7.1f} ms total  {name}')
+
+            heavy = [name for name in HEAVY_MODULES if name in runs[0]]
+            if heavy:
+                self.stdout.write(f'    heavy dependencies imported: {", ".join(heavy)}')
+                if not options['allow_heavy']:
+                    failures.append(f'{module} imports {", ".join(heavy)}')
+
+            if options['budget_ms'] and cumulative > options['budget_ms']:
+                failures.append(f'{module} takes {cumulative:.1f} ms (budget {options["budget_ms"]:.0f} ms)')
+
+        if failures:
+            raise CommandError('; '.join(failures))
+        self.stdout.write('🎉 Import-time check passed!')
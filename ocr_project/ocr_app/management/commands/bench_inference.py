@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+import time
+import numpy as np
+import pandas as pd
+from ocr_app.services.disease_models import models, sklearn_model
+
+
+def per_call(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+class Command(BaseCommand):
+    help = 'Check the NumPy LinearEngine against sklearn and time a single prediction with both'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--samples', type=int, default=2000, help='Random feature vectors per disease for the parity check')
+        parser.add_argument('--repeat', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        for disease in models:
+            models[disease]
+        engine = models.engine()
+        rng = np.random.default_rng(0)
+
+        for disease in engine.diseases:
+            model, cols = models[disease]
+            model = sklearn_model(model, cols)
+
+            # Parity: same labels, same probabilities as sklearn
+            X = rng.uniform(0, 300, size=(options['samples'], len(cols)))
+            frame = pd.DataFrame(X, columns=cols)
+            labels, proba = engine.score(disease, X)
+            if not np.array_equal(labels, model.predict(frame)):
+                raise CommandError(f'{disease}: labels differ from sklearn')
+            proba_diff = np.abs(proba - model.predict_proba(frame)[:, 1]).max()
+
+            values = dict(zip(cols, X[0]))
+            sklearn_s = per_call(lambda: model.predict(pd.DataFrame([values], columns=cols))[0], options['repeat'])
+            numpy_s = per_call(lambda: engine.predict_one(disease, values), options['repeat'])
+
+            self.stdout.write(
+                f'✅ {disease}: labels match on {len(X)} vectors, max |Δp| {proba_diff:.1e}; '
+                f'sklearn {sklearn_s * 1e6:.0f} µs vs numpy {numpy_s * 1e6:.0f} µs per call '
+                f'({sklearn_s / numpy_s:.0f}x)'
+            )
+
+        packed = engine.pack({d: {} for d in engine.diseases})
+        all_s = per_call(lambda: engine.score_all(packed), options['repeat'])
+        self.stdout.write(f'✅ all {len(engine.diseases)} diseases in one matmul: {all_s * 1e6:.0f} µs per call')
@@ -0,0 +1,81 @@
+from django.core.management.base import BaseCommand, CommandError
+import os
+import json
+from ._bench import run_snippet
+
+# Forks N workers the way gunicorn does and reports their memory from
+# /proc/<pid>/smaps_rollup. With preload the master loads the app and every
+# model before forking; without it each worker loads its own copy.
+SCRIPT = (
+    "import sys, gc, json, time\n"
+    "workers, preload = int(sys.argv[1]), sys.argv[2] == '1'\n"
+    "def load():\n"
+    "    from ocr_app.services.model_store import preload_release\n"
+    "    from ocr_app.views import analyze_reports\n"
+    "    release = preload_release()\n"
+    "    return release, analyze_reports\n"
+    "if preload:\n"
+    "    load()\n"
+    "    gc.freeze()\n"
+    "pids = []\n"
+    "for _ in range(workers):\n"
+    "    r, w = os.pipe()\n"
+    "    pid = os.fork()\n"
+    "    if pid == 0:\n"
+    "        os.close(r)\n"
+    "        release, analyze_reports = load()\n"
+    "        for disease in release.models:\n"
+    "            if release.models.is_loaded(disease):\n"
+    "                analyze_reports(['Glucose 150 Age 50 BMI 31 Creatinine 1.9'], disease)\n"
+    "        os.write(w, b'1')\n"
+    "        time.sleep(600)\n"
+    "        os._exit(0)\n"
+    "    os.close(w)\n"
+    "    os.read(r, 1)\n"
+    "    pids.append(pid)\n"
+    "def rollup(pid):\n"
+    "    fields = {}\n"
+    "    with open(f'/proc/{pid}/smaps_rollup') as f:\n"
+    "        for line in f:\n"
+    "            parts = line.split()\n"
+    "            if len(parts) == 3 and parts[2] == 'kB':\n"
+    "                fields[parts[0].rstrip(':')] = int(parts[1])\n"
+    "    return fields\n"
+    "stats = [rollup(pid) for pid in pids]\n"
+    "for pid in pids:\n"
+    "    os.kill(pid, 9)\n"
+    "    os.waitpid(pid, 0)\n"
+    "print(json.dumps(stats))\n"
+)
+
+
+class Command(BaseCommand):
+    help = 'Compare per-worker RSS/PSS of forked workers with and without preloading the models'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+
+    def run(self, workers, preload):
+        out = run_snippet(SCRIPT, workers, "1" if preload else "0")
+        return json.loads(out.stdout.strip().splitlines()[-1])
+
+    def handle(self, *args, **options):
+        if not os.path.exists('/proc/self/smaps_rollup'):
+            raise CommandError('Needs Linux /proc/<pid>/smaps_rollup')
+
+        workers = options['workers']
+        totals = {}
+        for name, preload in (("no preload", False), ("preload", True)):
+            stats = self.run(workers, preload)
+            rss = sum(s["Rss"] for s in stats) / workers / 1024
+            pss = sum(s["Pss"] for s in stats) / workers / 1024
+            private = sum(s["Private_Clean"] + s["Private_Dirty"] for s in stats) / workers / 1024
+            totals[name] = pss * workers
+            self.stdout.write(
+                f'✅ {name}: per worker RSS {rss:.1f} MiB, PSS {pss:.1f} MiB, '
+                f'private {private:.1f} MiB; {workers} workers PSS total {pss * workers:.1f} MiB'
+            )
+
+        saved = totals["no preload"] - totals["preload"]
+        self.stdout.write(f'🎉 Preload saves {saved:.1f} MiB across {workers} workers '
+                          f'({saved / workers:.1f} MiB per worker)')
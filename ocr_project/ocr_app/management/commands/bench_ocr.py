@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+import time
+import statistics
+from PIL import Image, ImageDraw
+from ocr_app.services.ocr_backends import BACKENDS, get_backend, tesserocr_available
+
+
+def sample_page(lines=12):
+    """A short synthetic lab page, the case where engine startup dominates."""
+    img = Image.new("L", (1240, 60 + lines * 40), 255)
+    draw = ImageDraw.Draw(img)
+    for i in range(lines):
+        draw.text((40, 30 + i * 40), f"HbA1c {5.0 + i / 10:.1f} %   Glucose Fasting {90 + i}.0 mg/dL", fill=0)
+    return img
+
+
+class Command(BaseCommand):
+    help = 'Compare per-page OCR latency of the pytesseract and tesserocr backends'
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='*', help='Page images to OCR (defaults to a synthetic page)')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        pages = [Image.open(path) for path in options['files']] or [sample_page()]
+        for page in pages:
+            page.load()
+
+        for name in BACKENDS:
+            if name == "tesserocr" and not tesserocr_available():
+                self.stdout.write(f'⏭️  {name}: not installed (pip install tesserocr)')
+                continue
+
+            start = time.perf_counter()
+            backend = get_backend(name)
+            startup = time.perf_counter() - start
+            if backend.name != name:
+                self.stdout.write(f'⏭️  {name}: failed to start, see warning above')
+                continue
+
+            timings = []
+            for _ in range(options['repeat']):
+                for page in pages:
+                    start = time.perf_counter()
+                    backend.image_to_text(page)
+                    timings.append(time.perf_counter() - start)
+
+            self.stdout.write(
+                f'✅ {name}: startup {startup * 1000:.1f} ms, '
+                f'per page mean {statistics.mean(timings) * 1000:.1f} ms, '
+                f'p50 {statistics.median(timings) * 1000:.1f} ms, '
+                f'max {max(timings) * 1000:.1f} ms over {len(timings)} pages'
+            )
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+import statistics
+from ._bench import run_snippet
+
+# name -> (untimed prelude, timed body)
+SCENARIOS = {
+    # What every worker / manage.py command pays when importing the views
+    "import ocr_app.views": ("", "import ocr_app.views\n"),
+    # First request that needs every model, served from artifacts
+    "load models (artifacts)": (
+        "from ocr_app.services.disease_models import models, read_artifact\n"
+        "assert all(read_artifact(d) for d in models), 'run manage.py train_models first'\n",
+        "for d in models: models[d]\n"
+    ),
+    # What importing the views used to add: fitting the original models from CSV
+    "train models (CSV)": (
+        "from ocr_app.services.disease_models import MODEL_SPECS, load_model\n",
+        "for d in ('diabetes', 'heart', 'liver', 'kidney', 'dengue'): load_model(MODEL_SPECS[d])\n"
+    ),
+}
+
+
+class Command(BaseCommand):
+    help = 'Measure startup cost of the views and of loading vs training the disease models'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def run(self, prelude, body):
+        try:
+            out = run_snippet(
+                "import time\n" + prelude + "start = time.perf_counter()\n" + body
+                + "print(time.perf_counter() - start)\n"
+            )
+        except CommandError as e:
+            return None, str(e)
+        return float(out.stdout.strip().splitlines()[-1]), None
+
+    def handle(self, *args, **options):
+        for name, (prelude, body) in SCENARIOS.items():
+            timings = []
+            for _ in range(options['repeat']):
+                seconds, error = self.run(prelude, body)
+                if error:
+                    self.stdout.write(f'⏭️  {name}: {error}')
+                    break
+                timings.append(seconds)
+            if timings:
+                self.stdout.write(
+                    f'✅ {name}: median {statistics.median(timings) * 1000:.1f} ms '
+                    f'(min {min(timings) * 1000:.1f} ms, {len(timings)} runs)'
+                )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+import os
+from ocr_app.services.side_effects import import_label_dump
+
+class Command(BaseCommand):
+    help = 'Pre-warm the side effect store from openFDA drug label dumps (.json or .json.zip)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+')
+
+    def handle(self, *args, **options):
+        total = 0
+        for path in options['paths']:
+            if not os.path.exists(path):
+                raise CommandError(f'No such file: {path}')
+            count = import_label_dump(path)
+            total += count
+            self.stdout.write(f'✅ {path}: {count} drugs')
+
+        self.stdout.write(f'🎉 Side Effects Import Complete! ({total} drugs)')
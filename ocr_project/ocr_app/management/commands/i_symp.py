@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 import pandas as pd
 from ocr_app.models import Disease, Symptom
+from ocr_app.services.symptom_catalog import deferred_catalog_bumps
 
 class Command(BaseCommand):
     help = 'Import diseases and symptoms from dataset.csv'
@@ -10,17 +11,19 @@ class Command(BaseCommand):
         df = pd.read_csv(path)
         total = len(df)
 
-        for i, row in df.iterrows():
-            disease_name = row['Disease'].strip()
-            disease, _ = Disease.objects.get_or_create(name=disease_name)
+        # Signals bump the catalog version once for the whole import, not per row
+        with deferred_catalog_bumps():
+            for i, row in df.iterrows():
+                disease_name = row['Disease'].strip()
+                disease, _ = Disease.objects.get_or_create(name=disease_name)
 
-            for col in row.index:
-                if col != 'Disease' and pd.notna(row[col]):
-                    symptom_name = str(row[col]).strip()
-                    symptom, _ = Symptom.objects.get_or_create(name=symptom_name)
-                    symptom.diseases.add(disease)
+                for col in row.index:
+                    if col != 'Disease' and pd.notna(row[col]):
+                        symptom_name = str(row[col]).strip()
+                        symptom, _ = Symptom.objects.get_or_create(name=symptom_name)
+                        symptom.diseases.add(disease)
 
-            if (i + 1) % 100 == 0 or i + 1 == total:
-                self.stdout.write(f'✅ Processed {i+1}/{total} rows')
+                if (i + 1) % 100 == 0 or i + 1 == total:
+                    self.stdout.write(f'✅ Processed {i+1}/{total} rows')
 
         self.stdout.write('🎉 Symptoms/Diseases Import Complete!')
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+import json
+from ocr_app.services.model_store import (
+    BUILTIN_VERSION, list_releases, read_release, read_current, publish_release, rollback_release
+)
+
+
+class Command(BaseCommand):
+    help = 'Publish, roll back or list model/threshold releases picked up by running workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['publish', 'rollback', 'list'])
+        parser.add_argument('--model', action='append', default=[], metavar='DISEASE=VERSION',
+                            help='Pin a model artifact version (default: newest artifact)')
+        parser.add_argument('--thresholds', help='JSON file with the full threshold table '
+                                                 '(default: keep the current one)')
+        parser.add_argument('--note', default='', help='Free text stored with the release')
+        parser.add_argument('--to', help='Release to roll back to, or "builtin" (default: previous)')
+
+    def handle(self, *args, **options):
+        try:
+            if options['action'] == 'publish':
+                models = dict(item.split('=', 1) for item in options['model'])
+                thresholds = None
+                if options['thresholds']:
+                    with open(options['thresholds'], encoding='utf-8') as f:
+                        thresholds = json.load(f)
+                release = publish_release(models, thresholds, options['note'])
+                self.stdout.write(f'✅ Published release {release["version"]}: {release["models"]}')
+
+            elif options['action'] == 'rollback':
+                release = rollback_release(options['to'])
+                self.stdout.write(f'✅ Rolled back to release {release["version"]}')
+
+            else:
+                current = read_current()
+                for version in list_releases():
+                    release = read_release(version)
+                    marker = '👉' if str(version) == current else '  '
+                    self.stdout.write(f'{marker} {version}  {release["published_at"]}  {release["note"]}')
+                if current is None:
+                    self.stdout.write('⏭️  No release published, serving the built-in thresholds and newest artifacts')
+                elif current == BUILTIN_VERSION:
+                    self.stdout.write(f'👉 {BUILTIN_VERSION}  built-in thresholds and newest artifacts')
+        except (ValueError, OSError) as e:
+            raise CommandError(str(e))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+import time
+from ocr_app.services.disease_models import MODEL_SPECS, train_model, save_artifact
+
+
+class Command(BaseCommand):
+    help = 'Train the disease models from their datasets and write versioned artifacts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('diseases', nargs='*', help='Diseases to train (default: all)')
+        parser.add_argument('--tag', help='Artifact version name (default: UTC timestamp)')
+
+    def handle(self, *args, **options):
+        diseases = options['diseases'] or list(MODEL_SPECS)
+        unknown = [d for d in diseases if d not in MODEL_SPECS]
+        if unknown:
+            raise CommandError(f'Unknown disease(s): {", ".join(unknown)}')
+
+        for disease in diseases:
+            start = time.perf_counter()
+            model, columns, encoders = train_model(MODEL_SPECS[disease])
+            try:
+                out_path = save_artifact(disease, model, columns, encoders, version=options['tag'])
+            except FileExistsError as e:
+                raise CommandError(str(e))
+            self.stdout.write(
+                f'✅ {disease}: {len(columns)} features, trained in '
+                f'{time.perf_counter() - start:.2f}s → {out_path}'
+            )
+
+        self.stdout.write('🎉 Model training complete!')
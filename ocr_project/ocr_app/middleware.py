@@ -0,0 +1,15 @@
+from .services.model_store import use_release
+
+
+class ModelReleaseMiddleware:
+    """
+    Pick up newly published model releases between requests and pin one
+    release for the whole request, so a swap never lands mid-analysis.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with use_release():
+            return self.get_response(request)
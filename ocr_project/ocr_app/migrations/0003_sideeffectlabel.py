@@ -0,0 +1,24 @@
+# Generated by Django 4.2.23 on 2026-10-17 17:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr_app', '0002_ocrjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SideEffectLabel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, unique=True)),
+                ('side_effects', models.JSONField(default=list)),
+                ('found', models.BooleanField(default=True)),
+                ('source', models.CharField(max_length=20)),
+                ('fetched_at', models.DateTimeField()),
+            ],
+        ),
+    ]
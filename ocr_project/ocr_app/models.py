@@ -1,4 +1,5 @@
 from django.db import models
+import uuid
 
 
 class Disease(models.Model):
@@ -24,3 +25,37 @@ class Medicine(models.Model):
     def __str__(self):
         return self.name
 
+
+class OcrJob(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    file = models.FileField(upload_to='ocr_jobs/', blank=True)
+    target_disease = models.CharField(max_length=50)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    pages_done = models.PositiveIntegerField(default=0)
+    pages_total = models.PositiveIntegerField(default=0)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.id} ({self.status})"
+
+
+class SideEffectLabel(models.Model):
+    """Side effects of one generic drug, cached from the label API or a label dump."""
+    name = models.CharField(max_length=200, unique=True)
+    side_effects = models.JSONField(default=list)
+    found = models.BooleanField(default=True)
+    source = models.CharField(max_length=20)
+    fetched_at = models.DateTimeField()
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,23 @@
+# services/charts.py
+# matplotlib is only imported by the code paths that draw charts
+from io import BytesIO
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+
+def draw_chart(matched_parameters):
+    labels = list(matched_parameters.keys())[:5]  # limit chart for space
+    values = [float(matched_parameters[k]) for k in labels]
+
+    plt.figure(figsize=(6, 3))
+    plt.barh(labels, values, color='teal')
+    plt.title("Extracted Parameter Values")
+    plt.tight_layout()
+
+    chart_buffer = BytesIO()
+    plt.savefig(chart_buffer, format='PNG')
+    chart_buffer.seek(0)
+    plt.close()
+    return chart_buffer
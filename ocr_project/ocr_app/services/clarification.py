@@ -0,0 +1,58 @@
+# services/clarification.py
+import secrets
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .symptom_catalog import get_catalog
+
+# A clarification session remembers what handle_symptoms worked out (the
+# corrected symptoms and the ranked candidate diseases), so a
+# clarification round only narrows that set instead of starting over.
+# Sessions live in the Django cache, which settings.CACHES shares between
+# workers; callers recompute from the symptoms only once a session expires.
+
+
+def session_key(token):
+    return f"clarify:{token}"
+
+
+def get_ttl():
+    return getattr(settings, "CLARIFY_SESSION_TTL", 600)
+
+
+def create_session(raw, symptoms, ranked, options):
+    """Store a session and return its token. `ranked` is clarify_disease() output."""
+    token = secrets.token_urlsafe(16)
+    cache.set(session_key(token), {
+        "raw": raw,
+        "symptoms": list(symptoms),
+        "candidates": [[name, len(matched)] for name, matched in ranked],
+        "options": list(options),
+    }, get_ttl())
+    return token
+
+
+def narrow_session(token, clarification):
+    """
+    Add the clarification symptom to a session and re-rank its candidates:
+    the ones that have the symptom move up. Returns the updated session, or
+    None if the token is unknown or has expired.
+    """
+    session = cache.get(session_key(token))
+    if session is None:
+        return None
+
+    catalog = get_catalog()
+    symptom = catalog.index.best(clarification) or clarification.strip()
+    if symptom not in session["symptoms"]:
+        with_symptom = catalog.incidence.diseases_with(symptom)
+        order = {name: i for i, name in enumerate(catalog.incidence.disease_names)}
+        for candidate in session["candidates"]:
+            if candidate[0] in with_symptom:
+                candidate[1] += 1
+        session["candidates"].sort(key=lambda c: (-c[1], order.get(c[0], len(order))))
+        session["symptoms"].append(symptom)
+
+    cache.set(session_key(token), session, get_ttl())
+    return session
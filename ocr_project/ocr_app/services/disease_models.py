@@ -0,0 +1,437 @@
+# services/disease_models.py
+import os
+import sys
+import mmap
+import json
+import time
+import hashlib
+import logging
+import threading
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+from .report_parser import FEATURE_SYNONYMS, register_feature_columns
+
+# numpy, pandas and sklearn are imported by the functions that train or
+# rebuild models, so importing this module (and the views) stays cheap
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.dirname(os.path.dirname(__file__))
+
+# ======== Model Registry =========
+# disease -> spec, declared with register_model(). Nothing is read or
+# trained until the model is first requested through `models`.
+MODEL_SPECS = {}
+
+MODEL_PARAMS = {"max_iter": 10000, "solver": "liblinear", "class_weight": "balanced"}
+
+
+def register_model(disease, dataset, target, aliases=None, features=None, negative=None, reader="csv"):
+    """
+    Declare a disease model.
+
+    dataset   file in ocr_app/ (read with pandas.read_csv, or read_excel
+              when reader="excel")
+    target    label column
+    aliases   {column: [names used in reports]}, merged into FEATURE_SYNONYMS
+    features  columns to train on (default: every other column)
+    negative  label values meaning "no disease"; any other value is 1.
+              Without it the label is used as-is (ckd/notckd and 1/2
+              labels are normalized)
+    """
+    MODEL_SPECS[disease] = {
+        "dataset": dataset,
+        "target": target,
+        "features": features,
+        "negative": negative,
+        "reader": reader,
+    }
+    if aliases:
+        FEATURE_SYNONYMS.setdefault(disease, {}).update(aliases)
+
+
+register_model("diabetes", "diabetes.csv", "Outcome")
+register_model("heart", "heart.csv", "target")
+register_model("liver", "indian_liver_patient.csv", "Dataset")
+register_model("kidney", "kidney_disease.csv", "classification")
+register_model("dengue", "Dengue diseases dataset.csv", "Final Output")
+
+# covid.csv (an Excel workbook) is not registered: its lab values are
+# standardized per column and the dataset doesn't keep the means and
+# standard deviations, so raw report values can't be put on its scale.
+# breast.csv is not registered either: its cell-nucleus measurements come
+# from biopsy images, not lab reports, so there is no threshold table for
+# the report endpoints to check it against.
+
+register_model(
+    "thyroid", "thyroidDF.csv", "target",
+    features=["age", "TSH", "T3", "TT4", "T4U", "FTI"],
+    negative=["-"],
+    aliases={
+        "age": ["Age"],
+        "TSH": ["TSH", "Thyroid Stimulating Hormone"],
+        "T3": ["T3", "Total T3", "Triiodothyronine"],
+        "TT4": ["TT4", "Total T4", "T4", "Thyroxine"],
+        "T4U": ["T4U", "T4 Uptake", "T Uptake"],
+        "FTI": ["FTI", "Free Thyroxine Index"],
+    },
+)
+
+
+# ======== Training =========
+def read_dataset(spec):
+    import pandas as pd
+
+    path = os.path.join(DATA_DIR, spec["dataset"])
+    if spec["reader"] == "excel":
+        return pd.read_excel(path)
+    return pd.read_csv(path)
+
+
+def train_model(spec):
+    """Fit a model on a spec's dataset. Returns (model, columns, encoders)."""
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.preprocessing import LabelEncoder
+
+    df = read_dataset(spec)
+    target_column = spec["target"]
+
+    if spec["features"]:
+        df = df[spec["features"] + [target_column]]
+    df = df.dropna()
+
+    if spec["negative"] is not None:
+        df[target_column] = (~df[target_column].isin(spec["negative"])).astype(int)
+
+    # Normalize string target values
+    elif df[target_column].dtype == 'object':
+        df[target_column] = df[target_column].map({'ckd': 1, 'notckd': 0})
+
+    # Normalize 2 → 0 if binary target column has values like 1/2
+    unique_vals = df[target_column].dropna().unique()
+    if sorted(unique_vals.tolist()) == [1, 2]:
+        df[target_column] = df[target_column].map({1: 1, 2: 0})
+
+    # Encode input features
+    encoders = {}
+    for col in df.columns:
+        if df[col].dtype == 'object' and col != target_column:
+            encoder = LabelEncoder()
+            df[col] = encoder.fit_transform(df[col])
+            encoders[col] = [str(c) for c in encoder.classes_]
+
+    X = df.drop(columns=[target_column])
+    y = df[target_column]
+
+    model = LogisticRegression(**MODEL_PARAMS)
+    model.fit(X, y)
+    return model, X.columns.tolist(), encoders
+
+
+def load_model(spec):
+    model, columns, _ = train_model(spec)
+    return model, columns
+
+
+# ======== Artifacts =========
+def get_artifact_dir():
+    return str(getattr(settings, "MODEL_ARTIFACT_DIR", os.path.join(DATA_DIR, "model_artifacts")))
+
+
+def dataset_sha256(path):
+    digest = hashlib.sha256()
+    with open(os.path.join(DATA_DIR, path), "rb") as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def save_artifact(disease, model, columns, encoders, version=None):
+    """
+    Write a trained model as <artifact dir>/<disease>/<version>.json plus
+    <version>.npy with its weights: one row per class, coefficients then
+    intercept. The .npy is memory-mapped on load, so processes share it.
+    A timestamp version already taken (two runs in the same second) gets
+    a -2, -3... suffix; an explicit version already taken raises
+    FileExistsError.
+    """
+    import numpy as np
+    import sklearn
+
+    spec = MODEL_SPECS[disease]
+    tagged = version is not None
+    base = version or datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+    out_dir = os.path.join(get_artifact_dir(), disease)
+    os.makedirs(out_dir, exist_ok=True)
+    # Claim the version by creating its .npy: versions are listed from the
+    # .json files, written last, so a half-written artifact is never read
+    version, suffix = base, 1
+    while True:
+        try:
+            weights_file = open(os.path.join(out_dir, f"{version}.npy"), "xb")
+            break
+        except FileExistsError:
+            if tagged:
+                raise FileExistsError(f"Model artifact {disease}/{version} already exists") from None
+            suffix += 1
+            version = f"{base}-{suffix}"
+    with weights_file:
+        np.save(weights_file, np.hstack([model.coef_, model.intercept_[:, None]]))
+
+    artifact = {
+        "disease": disease,
+        "version": version,
+        "trained_at": datetime.now(timezone.utc).isoformat(),
+        "dataset": spec["dataset"],
+        "dataset_sha256": dataset_sha256(spec["dataset"]),
+        "target_column": spec["target"],
+        "columns": columns,
+        "encoders": encoders,
+        "classes": [int(c) for c in model.classes_],
+        "weights": f"{version}.npy",
+        "params": MODEL_PARAMS,
+        "sklearn_version": sklearn.__version__,
+    }
+    out_path = os.path.join(out_dir, f"{version}.json")
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(artifact, f, indent=2)
+    return out_path
+
+
+def list_versions(disease):
+    """Versions of a disease's artifacts, oldest first by training time (file mtime if unknown)."""
+    out_dir = os.path.join(get_artifact_dir(), disease)
+    if not os.path.isdir(out_dir):
+        return []
+
+    trained = []
+    for name in os.listdir(out_dir):
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(out_dir, name)
+        try:
+            with open(path, encoding="utf-8") as f:
+                trained_at = datetime.fromisoformat(json.load(f)["trained_at"]).timestamp()
+        except (OSError, ValueError, KeyError, TypeError):
+            trained_at = os.path.getmtime(path)
+        trained.append((trained_at, name[:-5]))
+    return [version for _, version in sorted(trained)]
+
+
+def read_artifact(disease, version=None):
+    version = version or (list_versions(disease) or [None])[-1]
+    if version is None:
+        return None
+    with open(os.path.join(get_artifact_dir(), disease, f"{version}.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_weights(artifact):
+    """(coef, intercept) of an artifact; read-only views of the mapped .npy when it has one."""
+    import numpy as np
+
+    if "weights" not in artifact:
+        # Artifacts written before the .npy weights file
+        return np.array(artifact["coef"], dtype=float), np.array(artifact["intercept"], dtype=float)
+
+    path = os.path.join(get_artifact_dir(), artifact["disease"], artifact["weights"])
+    weights = np.load(path, mmap_mode="r")
+    return weights[:, :-1], weights[:, -1]
+
+
+class LinearModel:
+    """
+    Weights of a binary logistic model, all LinearEngine needs to score
+    it. Artifacts load into this, so serving never imports sklearn.
+    """
+
+    def __init__(self, classes, coef, intercept):
+        self.classes_ = classes
+        self.coef_ = coef
+        self.intercept_ = intercept
+
+
+def sklearn_model(model, columns):
+    """`model` as a fitted LogisticRegression, rebuilt from its weights if needed."""
+    import numpy as np
+    from sklearn.linear_model import LogisticRegression
+
+    if isinstance(model, LogisticRegression):
+        return model
+    fitted = LogisticRegression(**MODEL_PARAMS)
+    fitted.classes_ = np.asarray(model.classes_)
+    fitted.coef_, fitted.intercept_ = model.coef_, model.intercept_
+    fitted.n_features_in_ = len(columns)
+    fitted.feature_names_in_ = np.array(columns, dtype=object)
+    return fitted
+
+
+def model_from_artifact(artifact):
+    """
+    Model of an artifact: LinearModel for the NumPy engine, or a fitted
+    LogisticRegression with MODEL_INFERENCE = "sklearn" (and for models
+    with more than two classes, which the engine doesn't score).
+    """
+    import numpy as np
+
+    columns = list(artifact["columns"])
+    coef, intercept = load_weights(artifact)
+    model = LinearModel(np.array(artifact["classes"]), coef, intercept)
+    if getattr(settings, "MODEL_INFERENCE", "numpy") == "sklearn" or len(artifact["classes"]) != 2:
+        model = sklearn_model(model, columns)
+    return model, columns
+
+
+def is_mapped(array):
+    """True if `array` is a view of a memory-mapped file (shared between processes)."""
+    while array is not None:
+        if isinstance(array, mmap.mmap):
+            return True
+        array = getattr(array, "base", None)
+    return False
+
+
+def model_nbytes(model, columns):
+    """
+    Approximate size of a loaded model as (private bytes, mapped bytes):
+    weights read from a memory-mapped .npy are counted as mapped.
+    """
+    private = mapped = 0
+    for name in ("coef_", "intercept_", "classes_"):
+        array = getattr(model, name, None)
+        if array is None:
+            continue
+        if is_mapped(array):
+            mapped += array.nbytes
+        else:
+            private += array.nbytes
+    private += sum(sys.getsizeof(col) for col in columns) + sys.getsizeof(columns)
+    return private, mapped
+
+
+# ======== Lazy Model Dict =========
+class DiseaseModels:
+    """
+    Read-only {disease: (model, columns)} mapping over MODEL_SPECS that
+    loads each model on first access: from the artifact pinned in `versions`
+    or else the newest one written by `manage.py train_models`, or by
+    training on the dataset when there is none. With MODEL_IDLE_SECONDS set, models not used for that long are
+    dropped and reloaded on their next access.
+    """
+
+    def __init__(self, specs, versions=None):
+        self.specs = specs
+        self.versions = versions or {}
+        self._loaded = {}
+        self._stats = {}
+        self._engine = None
+        self._lock = threading.Lock()
+
+    def load(self, disease):
+        artifact = read_artifact(disease, self.versions.get(disease))
+        if artifact is not None:
+            model, columns = model_from_artifact(artifact)
+        else:
+            logger.warning("No model artifact for %s, training from %s (run `manage.py train_models`)",
+                           disease, self.specs[disease]["dataset"])
+            model, columns = load_model(self.specs[disease])
+
+        register_feature_columns(disease, columns)
+        return model, columns, ("artifact" if artifact is not None else "dataset")
+
+    def __getitem__(self, disease):
+        if disease not in self.specs:
+            raise KeyError(disease)
+        entry = self._loaded.get(disease)
+        if entry is None:
+            with self._lock:
+                entry = self._loaded.get(disease)
+                if entry is None:
+                    start = time.perf_counter()
+                    model, columns, source = self.load(disease)
+                    entry = self._loaded[disease] = (model, columns)
+                    private_bytes, mapped_bytes = model_nbytes(model, columns)
+                    self._stats[disease] = {
+                        "source": source,
+                        "version": self.versions.get(disease) or (list_versions(disease) or [None])[-1],
+                        "bytes": private_bytes,
+                        "mapped_bytes": mapped_bytes,
+                        "load_seconds": round(time.perf_counter() - start, 4),
+                        "loaded_at": time.time(),
+                    }
+                    self._engine = None
+        stats = self._stats.get(disease)
+        if stats is not None:
+            stats["last_used"] = time.time()
+        self.evict_idle()
+        return entry
+
+    def __contains__(self, disease):
+        return disease in self.specs
+
+    def __iter__(self):
+        return iter(self.specs)
+
+    def __len__(self):
+        return len(self.specs)
+
+    def keys(self):
+        return self.specs.keys()
+
+    def items(self):
+        return [(disease, self[disease]) for disease in self.specs]
+
+    def get(self, disease, default=None):
+        return self[disease] if disease in self.specs else default
+
+    def is_loaded(self, disease):
+        return disease in self._loaded
+
+    def evict(self, disease):
+        with self._lock:
+            if self._loaded.pop(disease, None) is not None:
+                self._stats.pop(disease, None)
+                self._engine = None
+                logger.info("Evicted disease model %s", disease)
+
+    def evict_idle(self):
+        idle_seconds = getattr(settings, "MODEL_IDLE_SECONDS", 0)
+        if not idle_seconds:
+            return
+        cutoff = time.time() - idle_seconds
+        for disease, stats in list(self._stats.items()):
+            if stats.get("last_used", stats["loaded_at"]) < cutoff:
+                self.evict(disease)
+
+    def memory_stats(self):
+        """Per loaded model: source, bytes, load time and last use, plus the totals."""
+        loaded = {disease: dict(stats) for disease, stats in self._stats.items()}
+        return {
+            "models": loaded,
+            "total_bytes": sum(s["bytes"] for s in loaded.values()),
+            "total_mapped_bytes": sum(s["mapped_bytes"] for s in loaded.values()),
+        }
+
+    def preload(self):
+        """Load every model and the engine, e.g. in the gunicorn master before forking."""
+        for disease in self.specs:
+            try:
+                self[disease]
+            except Exception:
+                logger.exception("Could not preload disease model %s", disease)
+        return self.engine()
+
+    def engine(self):
+        """LinearEngine over the models loaded so far, rebuilt when one is added or evicted."""
+        from .inference import LinearEngine
+
+        with self._lock:
+            if self._engine is None:
+                self._engine = LinearEngine(dict(self._loaded))
+            return self._engine
+
+
+models = DiseaseModels(MODEL_SPECS)
@@ -0,0 +1,86 @@
+# services/inference.py
+import numpy as np
+
+
+def expit(x):
+    """Logistic sigmoid, overflow-free; scipy.special.expit without importing scipy."""
+    return np.exp(-np.logaddexp(0, -x))
+
+
+class LinearEngine:
+    """
+    Scores the binary logistic models without pandas or sklearn. All
+    coefficients live in one block-diagonal (n_features, n_diseases) matrix
+    over the concatenated feature vectors of every disease, so a batch of
+    reports is scored for every disease with a single matmul.
+    """
+
+    def __init__(self, entries):
+        """`entries`: {disease: (binary logistic model with coef_/intercept_/classes_, columns)}."""
+        self.diseases = [d for d, (model, _) in entries.items() if np.shape(model.coef_)[0] == 1]
+        self.columns = {d: list(entries[d][1]) for d in self.diseases}
+
+        self.offsets = {}
+        start = 0
+        for disease in self.diseases:
+            end = start + len(self.columns[disease])
+            self.offsets[disease] = (start, end)
+            start = end
+
+        self.coef = np.zeros((start, len(self.diseases)))
+        self.intercept = np.zeros(len(self.diseases))
+        self.classes = np.zeros((len(self.diseases), 2), dtype=np.int64)
+        for j, disease in enumerate(self.diseases):
+            model = entries[disease][0]
+            a, b = self.offsets[disease]
+            self.coef[a:b, j] = model.coef_[0]
+            self.intercept[j] = model.intercept_[0]
+            self.classes[j] = model.classes_
+        self.index = {disease: j for j, disease in enumerate(self.diseases)}
+
+    def __contains__(self, disease):
+        return disease in self.index
+
+    @property
+    def n_features(self):
+        return self.coef.shape[0]
+
+    def vectorize(self, disease, values):
+        """Feature dict -> vector in the model's column order (missing = 0)."""
+        return np.array([values.get(col, 0) or 0 for col in self.columns[disease]], dtype=float)
+
+    def pack_rows(self, disease, rows):
+        """Feature dicts of many reports -> (n, n_columns) matrix for score()."""
+        return np.array([self.vectorize(disease, values) for values in rows]).reshape(len(rows), -1)
+
+    def pack(self, values_by_disease):
+        """{disease: feature dict} -> one concatenated vector for score_all()."""
+        x = np.zeros(self.n_features)
+        for disease, values in values_by_disease.items():
+            if disease in self.index:
+                a, b = self.offsets[disease]
+                x[a:b] = self.vectorize(disease, values)
+        return x
+
+    def _labels(self, scores, j):
+        return self.classes[j][(scores > 0).astype(int)]
+
+    def score(self, disease, X):
+        """X: (n, n_columns) for one disease -> (labels, P(class 1))."""
+        j = self.index[disease]
+        a, b = self.offsets[disease]
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        # Same expression sklearn's decision_function evaluates
+        scores = (X @ self.coef[a:b, j:j + 1] + self.intercept[j])[:, 0]
+        return self._labels(scores, j), expit(scores)
+
+    def score_all(self, X):
+        """X: (n, n_features) packed vectors -> (labels, probabilities), each (n, n_diseases)."""
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        scores = X @ self.coef + self.intercept
+        labels = np.take_along_axis(self.classes.T, (scores > 0).astype(int), axis=0)
+        return labels, expit(scores)
+
+    def predict_one(self, disease, values):
+        labels, proba = self.score(disease, self.vectorize(disease, values))
+        return int(labels[0]), float(proba[0])
@@ -0,0 +1,111 @@
+# services/jobs.py
+import logging
+import threading
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from ..models import OcrJob
+from .ocr import run_ocr
+
+logger = logging.getLogger(__name__)
+
+# Local job pool, no broker: jobs are persisted in OcrJob so any worker can
+# answer status polls, but they run in the process that accepted them.
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_job_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=int(getattr(settings, "OCR_JOB_WORKERS", 2)),
+                thread_name_prefix="ocr-job"
+            )
+        return _executor
+
+
+def submit_ocr_job(file, target_disease):
+    job = OcrJob.objects.create(file=file, target_disease=target_disease)
+    get_job_executor().submit(run_ocr_job, job.pk)
+    return job
+
+
+def run_ocr_job(job_id):
+    # Imported here, views imports this module
+    from ..views import build_ocr_response, report_stop_condition
+    from .model_store import use_release
+
+    close_old_connections()
+    try:
+        # Only a queued job is claimed: one that already failed stays failed
+        claimed = OcrJob.objects.filter(pk=job_id, status="queued").update(
+            status="running", updated_at=timezone.now()
+        )
+        if not claimed:
+            return
+        job = OcrJob.objects.get(pk=job_id)
+
+        def progress(done, total):
+            OcrJob.objects.filter(pk=job_id).update(
+                pages_done=done, pages_total=total, updated_at=timezone.now()
+            )
+
+        # The job keeps the release it started with, even if a new one is published
+        with use_release():
+            with job.file.open("rb") as f:
+                ocr = run_ocr(f, progress=progress, stop_when=report_stop_condition(job.target_disease))
+
+            payload, status_code = build_ocr_response(ocr, job.target_disease)
+        OcrJob.objects.filter(pk=job_id, status="running").update(
+            status="done" if status_code == 200 else "failed",
+            result=payload,
+            error=payload.get("error", ""),
+            updated_at=timezone.now()
+        )
+    except Exception as e:
+        logger.exception("OCR job %s failed", job_id)
+        OcrJob.objects.filter(pk=job_id, status="running").update(
+            status="failed", error=str(e), updated_at=timezone.now()
+        )
+    finally:
+        # The upload is only needed until OCR is done
+        job = OcrJob.objects.filter(pk=job_id).first()
+        if job and job.file:
+            job.file.delete(save=True)
+        close_old_connections()
+
+
+def expire_stale_job(job):
+    """
+    Fail running jobs whose worker died (no progress for
+    OCR_JOB_STALE_SECONDS). Queued jobs are only waiting for a free worker.
+    """
+    if job.status != "running":
+        return job
+
+    stale_after = timedelta(seconds=int(getattr(settings, "OCR_JOB_STALE_SECONDS", 600)))
+    if timezone.now() - job.updated_at > stale_after:
+        job.status = "failed"
+        job.error = "Job was lost before it finished, please resubmit."
+        job.save(update_fields=["status", "error", "updated_at"])
+    return job
+
+
+def job_status_payload(job):
+    payload = {
+        "job_id": str(job.pk),
+        "status": job.status,
+        "pages_done": job.pages_done,
+        "pages_total": job.pages_total,
+    }
+    if job.status == "done":
+        payload["result"] = job.result
+    elif job.status == "failed":
+        payload["error"] = job.error or "OCR job failed"
+    return payload
@@ -0,0 +1,86 @@
+# services/medicine_table.py
+import threading
+
+from django.conf import settings
+
+from ..models import Disease, Medicine
+from .symptom_catalog import SymptomIndex, catalog_version, normalize
+
+# Model / report keys whose Disease row has a different name
+DISEASE_ALIASES = {
+    "diabetes": "Diabetes (Type 2)",
+    "heart": "Heart attack",
+    "kidney": "Chronic cholestasis",
+    "liver": "Alcoholic hepatitis",
+    "cold": "Common Cold",
+    "flu": "Colds & Flu",
+    "hypertension": "Hypertension",
+    "hepatitis": "Hepatitis B",
+    "cancer": "Cancer",
+    "migraine": "Migraine",
+    "pneumonia": "Pneumonia",
+    "dengue": "Dengue",
+    "aids": "AIDS/HIV",
+    "allergy": "Allergy",
+    "asthma": "Asthma",
+    "thyroid": "Hypothyroidism",
+    # ➕ Add more mappings as needed
+}
+
+
+class MedicineTable:
+    """
+    Normalized disease name -> its first `limit` medicines, read with one
+    query. A name resolves by alias, then exact match, then the first
+    disease containing it (what the old icontains lookup did), then the
+    closest name by trigram/difflib similarity.
+    """
+
+    def __init__(self, version, limit=5):
+        self.version = version
+        self.limit = limit
+
+        diseases = list(Disease.objects.order_by("id").values_list("id", "name"))
+        self.names = [normalize(name) for _, name in diseases]
+        self.medicines = {key: [] for key in self.names}
+        key_of = {pk: key for (pk, _), key in zip(diseases, self.names)}
+
+        rows = Medicine.objects.order_by("disease_id", "id").values_list("disease_id", "name", "link")
+        for disease_id, name, link in rows.iterator():
+            meds = self.medicines.get(key_of.get(disease_id))
+            if meds is not None and len(meds) < limit:
+                meds.append({"name": name, "link": link})
+
+        self.aliases = {key: normalize(name) for key, name in DISEASE_ALIASES.items()}
+        self.index = SymptomIndex(self.names)
+
+    def resolve(self, disease_name):
+        """Normalized Disease name for `disease_name`, or None."""
+        key = normalize(disease_name)
+        if not key:
+            return None
+        key = self.aliases.get(key, key)
+        if key in self.medicines:
+            return key
+        for name in self.names:
+            if key in name:
+                return name
+        return self.index.best(key)
+
+    def lookup(self, disease_name):
+        key = self.resolve(disease_name)
+        return [dict(med) for med in self.medicines.get(key, ())]
+
+
+_table = None
+_table_lock = threading.Lock()
+
+
+def get_medicine_table():
+    """Table for the current catalog version, rebuilt when it changes (e.g. after `i_med`)."""
+    global _table
+    version = catalog_version()
+    with _table_lock:
+        if _table is None or _table.version != version:
+            _table = MedicineTable(version, limit=getattr(settings, "MEDICINES_PER_DISEASE", 5))
+        return _table
@@ -0,0 +1,231 @@
+# services/model_store.py
+import os
+import json
+import time
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+from .report_parser import REPORT_THRESHOLDS, register_threshold_aliases
+from .disease_models import MODEL_SPECS, DiseaseModels, get_artifact_dir, list_versions
+from .disease_models import models as builtin_models
+
+logger = logging.getLogger(__name__)
+
+# Release used when nothing has been published: newest artifacts and the
+# thresholds in report_parser.py
+BUILTIN_VERSION = "builtin"
+
+
+# ======== Release Files =========
+# <artifact dir>/releases/<n>.json holds the artifact version of every model
+# and the full threshold table; <artifact dir>/releases/CURRENT names the
+# active one. Workers poll CURRENT, see ModelStore.refresh().
+def get_release_dir():
+    return os.path.join(get_artifact_dir(), "releases")
+
+
+def list_releases():
+    release_dir = get_release_dir()
+    if not os.path.isdir(release_dir):
+        return []
+    return sorted(int(name[:-5]) for name in os.listdir(release_dir) if name[:-5].isdigit())
+
+
+def read_release(version):
+    with open(os.path.join(get_release_dir(), f"{version}.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def read_current():
+    try:
+        with open(os.path.join(get_release_dir(), "CURRENT"), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def write_current(version):
+    """Point CURRENT at a release; os.replace makes the switch atomic."""
+    path = os.path.join(get_release_dir(), "CURRENT")
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(str(version))
+    os.replace(tmp_path, path)
+
+
+def publish_release(model_versions=None, thresholds=None, note=""):
+    """
+    Write a new release and make it current. Models default to their newest
+    artifact, thresholds to the current release's table.
+    """
+    current = read_current()
+    base = read_release(current) if current not in (None, BUILTIN_VERSION) else builtin_release()
+
+    models = {disease: (list_versions(disease) or [None])[-1] for disease in MODEL_SPECS}
+    models = {disease: version for disease, version in models.items() if version}
+    models.update(model_versions or {})
+
+    for disease, version in models.items():
+        if version not in list_versions(disease):
+            raise ValueError(f"No artifact {version!r} for {disease}")
+
+    version = (list_releases() or [0])[-1] + 1
+    release = {
+        "version": str(version),
+        "published_at": datetime.now(timezone.utc).isoformat(),
+        "note": note,
+        "models": models,
+        "thresholds": thresholds if thresholds is not None else base["thresholds"],
+    }
+
+    os.makedirs(get_release_dir(), exist_ok=True)
+    with open(os.path.join(get_release_dir(), f"{version}.json"), "w", encoding="utf-8") as f:
+        json.dump(release, f, indent=2)
+    write_current(version)
+    return release
+
+
+def builtin_release():
+    """The release served before anything is published, as a release dict."""
+    return {"version": BUILTIN_VERSION, "models": {}, "thresholds": REPORT_THRESHOLDS}
+
+
+def rollback_release(to=None):
+    """
+    Make `to` (default: the release before the current one) current again.
+    BUILTIN_VERSION counts as the release before release 1.
+    """
+    releases = list_releases()
+    current = read_current()
+    if to is None:
+        if current in (None, BUILTIN_VERSION):
+            raise ValueError("No earlier release to roll back to")
+        older = [v for v in releases if v < int(current)]
+        to = older[-1] if older else BUILTIN_VERSION
+    if str(to) == BUILTIN_VERSION:
+        write_current(BUILTIN_VERSION)
+        return builtin_release()
+    if int(to) not in releases:
+        raise ValueError(f"No release {to}")
+    write_current(to)
+    return read_release(to)
+
+
+# ======== Runtime =========
+class Release:
+    """One published set of models + thresholds, loaded lazily like `models`."""
+
+    def __init__(self, version, models, thresholds):
+        self.version = version
+        self.models = models
+        self.thresholds = thresholds
+
+    @classmethod
+    def from_file(cls, version):
+        data = read_release(version)
+        register_threshold_aliases(data["thresholds"])
+        return cls(data["version"], DiseaseModels(MODEL_SPECS, data["models"]), data["thresholds"])
+
+
+class ModelStore:
+    """
+    Holds the active Release. refresh() re-reads CURRENT at most every
+    MODEL_STORE_POLL_SECONDS; a new release is loaded (warming the models
+    the old one had loaded) before the reference is swapped, so requests
+    never see a half-loaded release.
+    """
+
+    def __init__(self):
+        self._release = Release(BUILTIN_VERSION, builtin_models, REPORT_THRESHOLDS)
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def current(self):
+        return self._release
+
+    def refresh(self, force=False):
+        poll_seconds = getattr(settings, "MODEL_STORE_POLL_SECONDS", 5)
+        if not force and time.monotonic() - self._checked_at < poll_seconds:
+            return self._release
+
+        with self._lock:
+            self._checked_at = time.monotonic()
+            version = read_current() or BUILTIN_VERSION
+            old = self._release
+            if version == old.version:
+                return old
+
+            try:
+                if version == BUILTIN_VERSION:
+                    new = Release(BUILTIN_VERSION, builtin_models, REPORT_THRESHOLDS)
+                else:
+                    new = Release.from_file(version)
+                for disease in old.models:
+                    if old.models.is_loaded(disease):
+                        new.models[disease]
+            except Exception:
+                logger.exception("Could not load model release %s, keeping %s", version, old.version)
+                return old
+
+            self._release = new
+            logger.info("Switched model release %s -> %s", old.version, new.version)
+            return new
+
+
+store = ModelStore()
+
+
+def preload_release():
+    """Load the current release's models and engine (gunicorn master, before forking)."""
+    release = store.refresh(force=True)
+    release.models.preload()
+    return release
+
+
+# Release pinned for the current request / job, see use_release()
+_active = contextvars.ContextVar("model_release", default=None)
+
+
+def current_release():
+    return _active.get() or store.current()
+
+
+@contextmanager
+def use_release(release=None):
+    """Pin a release (default: the latest) for the duration of the block."""
+    token = _active.set(release or store.refresh())
+    try:
+        yield _active.get()
+    finally:
+        _active.reset(token)
+
+
+def current_thresholds():
+    return current_release().thresholds
+
+
+class ActiveModels:
+    """`models` as seen by the views: the mapping of the pinned release."""
+
+    def __getitem__(self, disease):
+        return current_release().models[disease]
+
+    def __contains__(self, disease):
+        return disease in current_release().models
+
+    def __iter__(self):
+        return iter(current_release().models)
+
+    def __len__(self):
+        return len(current_release().models)
+
+    def __getattr__(self, name):
+        return getattr(current_release().models, name)
+
+
+models = ActiveModels()
@@ -0,0 +1,348 @@
+# services/ocr.py
+import os
+import time
+import shutil
+import tempfile
+import contextlib
+import subprocess
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from functools import partial
+
+from django.conf import settings
+
+from . import ocr_cache
+from .ocr_backends import get_backend, resolve_backend_name
+
+POPPLER_PATH = r"C:\Users\ayush\Downloads\poppler-24.08.0\Library\bin"
+os.environ["PATH"] += os.pathsep + POPPLER_PATH
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+# ======== Page Pool =========
+# One bounded process pool per Django process, created on first use so
+# `manage.py` commands and workers that never OCR don't pay for it.
+_pool = None
+_pool_size = 0
+_pool_lock = threading.Lock()
+
+
+def get_ocr_workers():
+    return max(1, int(getattr(settings, "OCR_WORKERS", 1) or 1))
+
+
+def get_ocr_pool():
+    global _pool, _pool_size
+    workers = get_ocr_workers()
+
+    with _pool_lock:
+        if _pool is None or _pool_size != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            start_method = getattr(settings, "OCR_POOL_START_METHOD", "spawn")
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context(start_method)
+            )
+            _pool_size = workers
+        return _pool
+
+
+def shutdown_ocr_pool():
+    global _pool, _pool_size
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        _pool = None
+        _pool_size = 0
+
+
+def get_backend_name():
+    return resolve_backend_name(getattr(settings, "OCR_BACKEND", "auto"))
+
+
+def ocr_page(image, backend="pytesseract"):
+    """OCR a single page. Runs inside the pool workers, returns (text, seconds)."""
+    start = time.perf_counter()
+    text = get_backend(backend).image_to_text(image)
+    return text, time.perf_counter() - start
+
+
+def ocr_images(images, page_numbers=None):
+    """
+    OCR every page, in parallel when there is more than one page and more
+    than one worker, and return (texts, page_stats) in page order.
+    """
+    images = list(images)
+    page_numbers = page_numbers or range(1, len(images) + 1)
+    workers = get_ocr_workers()
+    run_page = partial(ocr_page, backend=get_backend_name())
+
+    if workers > 1 and len(images) > 1:
+        try:
+            # map() yields in submission order, so pages come back in order
+            results = list(get_ocr_pool().map(run_page, images))
+        except BrokenProcessPool:
+            logger.warning("OCR pool broke, falling back to sequential OCR")
+            shutdown_ocr_pool()
+            results = [run_page(img) for img in images]
+    else:
+        results = [run_page(img) for img in images]
+
+    texts = [text for text, _ in results]
+    page_stats = [
+        {"page": page, "source": "ocr", "seconds": round(seconds, 4), "chars": len(text)}
+        for page, (text, seconds) in zip(page_numbers, results)
+    ]
+    return texts, page_stats
+
+
+# ======== Streaming PDF Rasterization =========
+def get_pdf_dpi():
+    return int(getattr(settings, "OCR_PDF_DPI", 200))
+
+
+def get_stream_window():
+    # Pages rendered (and held in memory) at once, whatever the pool size
+    return max(1, int(getattr(settings, "OCR_STREAM_WINDOW", 2) or 1))
+
+
+@contextlib.contextmanager
+def spool_upload(file):
+    """Yield a path on disk for the upload, copying it in chunks if needed."""
+    if hasattr(file, "temporary_file_path"):
+        yield file.temporary_file_path()
+        return
+
+    suffix = os.path.splitext(file.name)[1]
+    tmp = tempfile.NamedTemporaryFile(suffix=suffix, delete=False)
+    try:
+        with tmp:
+            if hasattr(file, "chunks"):
+                for chunk in file.chunks():
+                    tmp.write(chunk)
+            else:
+                shutil.copyfileobj(file, tmp)
+        yield tmp.name
+    finally:
+        os.remove(tmp.name)
+
+
+def count_pdf_pages(path):
+    from pdf2image import pdfinfo_from_path
+
+    return int(pdfinfo_from_path(path)["Pages"])
+
+
+def iter_pdf_windows(path, pages, window=None):
+    """
+    Rasterize the given PDF pages a few at a time, yielding
+    (page_numbers, images). Consecutive pages are rendered in one call.
+    """
+    from pdf2image import convert_from_path
+
+    window = window or get_stream_window()
+    pages = list(pages)
+
+    for i in range(0, len(pages), window):
+        chunk = pages[i:i + window]
+        images = []
+        run_start = prev = chunk[0]
+        for page in chunk[1:] + [None]:
+            if page is not None and page == prev + 1:
+                prev = page
+                continue
+            images.extend(convert_from_path(path, dpi=get_pdf_dpi(), first_page=run_start, last_page=prev))
+            run_start = prev = page
+        yield chunk, images
+
+
+# ======== PDF Text Layer =========
+def has_usable_text(text):
+    min_chars = int(getattr(settings, "OCR_TEXT_LAYER_MIN_CHARS", 50))
+    return sum(ch.isalnum() for ch in text) >= min_chars
+
+
+def extract_text_layer(path, total):
+    """
+    Read the embedded text of every page with poppler's pdftotext, one
+    call for the whole document. Returns a list with one string per page,
+    or None if the text layer could not be read.
+    """
+    if not getattr(settings, "OCR_USE_TEXT_LAYER", True):
+        return None
+
+    try:
+        out = subprocess.run(
+            ["pdftotext", "-layout", "-enc", "UTF-8", path, "-"],
+            capture_output=True, timeout=60, check=True
+        ).stdout.decode("utf-8", errors="replace")
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.warning("pdftotext failed, OCRing every page: %s", e)
+        return None
+
+    # pdftotext ends every page with a form feed
+    pages = out.split("\f")[:total]
+    return pages + [""] * (total - len(pages))
+
+
+def leading_pages_text(texts):
+    """Join pages 1..n for the longest run of pages that are all done."""
+    parts = []
+    page = 1
+    while page in texts:
+        parts.append(texts[page])
+        page += 1
+    return "\n".join(parts)
+
+
+def ocr_pdf_streaming(file, progress=None, stop_when=None):
+    """
+    OCR a PDF without holding the whole upload or all of its pages in
+    memory: each window is rendered, OCR'd and freed before the next one.
+    Pages that already carry a usable text layer are read directly and
+    never rasterized.
+
+    If `stop_when(text)` returns True for the leading pages done so far,
+    the remaining pages are skipped. Returns (texts, page_stats, pages_total).
+    """
+    texts, page_stats = {}, {}
+
+    with spool_upload(file) as path:
+        total = count_pdf_pages(path)
+
+        start = time.perf_counter()
+        layer = extract_text_layer(path, total)
+        if layer is not None:
+            layer_seconds = (time.perf_counter() - start) / max(total, 1)
+            for page, text in enumerate(layer, start=1):
+                if has_usable_text(text):
+                    texts[page] = text
+                    page_stats[page] = {
+                        "page": page, "source": "text_layer",
+                        "seconds": round(layer_seconds, 4), "chars": len(text)
+                    }
+
+        if progress:
+            progress(len(texts), total)
+
+        pending = [page for page in range(1, total + 1) if page not in texts]
+        if stop_when and pending and stop_when(leading_pages_text(texts)):
+            pending = []
+
+        for page_numbers, images in iter_pdf_windows(path, pending):
+            window_texts, window_stats = ocr_images(images, page_numbers)
+            for img in images:
+                img.close()
+            del images
+
+            texts.update(zip(page_numbers, window_texts))
+            page_stats.update(zip(page_numbers, window_stats))
+            if progress:
+                progress(len(texts), total)
+
+            if stop_when and len(texts) < total and stop_when(leading_pages_text(texts)):
+                break
+
+    pages = sorted(texts)
+    return [texts[p] for p in pages], [page_stats[p] for p in pages], total
+
+
+# ======== Text Extraction =========
+def text_result(text):
+    """A run_ocr()-shaped result for text that needed no OCR."""
+    return {
+        "text": text,
+        "pages": [],
+        "pages_total": 0,
+        "stopped_early": False,
+        "workers": 0,
+        "preprocess": {},
+        "seconds": 0.0,
+        "cached": False
+    }
+
+
+def run_ocr(file, progress=None, stop_when=None):
+    """
+    Extract text from an uploaded report and return it together with
+    per-page timings: {"text", "pages", "pages_total", "stopped_early",
+    "workers", "preprocess", "seconds", "cached"}.
+    Repeat uploads of the same bytes are served from the OCR cache.
+
+    `progress(pages_done, pages_total)` is called as pages finish.
+    `stop_when(text)` lets PDF OCR stop once the leading pages hold
+    everything the caller needs (see ocr_pdf_streaming).
+    """
+    if file.name.lower().endswith(".txt") or not ocr_cache.is_enabled():
+        return {**_ocr_upload(file, progress, stop_when), "cached": False}
+
+    start = time.perf_counter()
+    key = ocr_cache.key_for_upload(file)
+    cached = ocr_cache.lookup(key)
+    if cached is not None:
+        cached["cached"] = True
+        cached["seconds"] = round(time.perf_counter() - start, 4)
+        if progress:
+            progress(len(cached["pages"]), len(cached["pages"]))
+        return cached
+
+    result = _ocr_upload(file, progress, stop_when)
+    # Partial text is only good for the target it was stopped for
+    if not result["stopped_early"]:
+        ocr_cache.store(key, result)
+    return {**result, "cached": False}
+
+
+def _ocr_upload(file, progress=None, stop_when=None):
+    name = file.name.lower()
+    start = time.perf_counter()
+    preprocess_timings = {}
+
+    if name.endswith(".pdf") and getattr(settings, "OCR_STREAM_PDF", True):
+        texts, page_stats, pages_total = ocr_pdf_streaming(file, progress, stop_when)
+    elif name.endswith(".pdf"):
+        from pdf2image import convert_from_bytes
+        texts, page_stats = ocr_images(convert_from_bytes(file.read(), dpi=get_pdf_dpi()))
+        pages_total = len(page_stats)
+    elif name.endswith(IMAGE_EXTENSIONS):
+        from . import preprocess
+        image, preprocess_timings = preprocess.open_image(file)
+        texts, page_stats = ocr_images([image])
+        pages_total = 1
+    elif name.endswith(".txt"):
+        result = text_result(file.read().decode("utf-8"))
+        result["seconds"] = round(time.perf_counter() - start, 4)
+        return result
+    else:
+        raise ValueError("Unsupported file format.")
+
+    if progress:
+        progress(len(page_stats), pages_total)
+
+    result = {
+        "text": "\n".join(texts),
+        "pages": page_stats,
+        "pages_total": pages_total,
+        "stopped_early": len(page_stats) < pages_total,
+        "workers": min(get_ocr_workers(), len(page_stats)),
+        "preprocess": preprocess_timings,
+        "seconds": round(time.perf_counter() - start, 4)
+    }
+
+    logger.info(
+        "OCR %s: %d page(s) in %.2fs with %d worker(s) %s",
+        file.name, len(page_stats), result["seconds"], result["workers"],
+        [p["seconds"] for p in page_stats]
+    )
+    return result
+
+
+def extract_text_from_any_file(file):
+    return run_ocr(file)["text"]
@@ -0,0 +1,79 @@
+# services/ocr_backends.py
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+OCR_LANG = "eng"
+
+
+class PytesseractBackend:
+    """Runs the tesseract CLI once per page (fork + temp files + model load)."""
+    name = "pytesseract"
+
+    def __init__(self):
+        # Imported on first use: pytesseract pulls in pandas when installed
+        import pytesseract
+        pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+        self.image_to_string = pytesseract.image_to_string
+
+    def image_to_text(self, image):
+        return self.image_to_string(image, lang=OCR_LANG)
+
+
+class TesserocrBackend:
+    """
+    Keeps one loaded tesseract API per thread and hands it images in
+    memory, so the traineddata is read once instead of once per page.
+    Needs the optional `tesserocr` package.
+    """
+    name = "tesserocr"
+
+    def __init__(self):
+        from tesserocr import PyTessBaseAPI
+        self.api = PyTessBaseAPI(lang=OCR_LANG)
+
+    def image_to_text(self, image):
+        self.api.SetImage(image)
+        return self.api.GetUTF8Text()
+
+
+BACKENDS = {
+    PytesseractBackend.name: PytesseractBackend,
+    TesserocrBackend.name: TesserocrBackend,
+}
+
+# Engines are per thread: a tesseract API instance is not thread safe
+_local = threading.local()
+
+
+def tesserocr_available():
+    try:
+        import tesserocr  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def resolve_backend_name(name):
+    """Map the OCR_BACKEND setting ("auto", "tesserocr", "pytesseract") to a backend."""
+    if name == "auto":
+        return TesserocrBackend.name if tesserocr_available() else PytesseractBackend.name
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown OCR backend: {name}")
+    return name
+
+
+def get_backend(name):
+    engines = getattr(_local, "engines", None)
+    if engines is None:
+        engines = _local.engines = {}
+
+    if name not in engines:
+        try:
+            engines[name] = BACKENDS[name]()
+        except Exception as e:
+            # The CLI path always works as long as tesseract is installed
+            logger.warning("OCR backend %s unavailable, using pytesseract: %s", name, e)
+            engines[name] = PytesseractBackend()
+    return engines[name]
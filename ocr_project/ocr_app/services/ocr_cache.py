@@ -0,0 +1,232 @@
+# services/ocr_cache.py
+import os
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Bump when a change to the OCR pipeline makes old cached text stale
+OCR_PIPELINE_VERSION = 4
+
+_lock = threading.Lock()
+_memory = OrderedDict()
+_memory_bytes = 0
+_disk_bytes = None
+
+stats = {
+    "memory_hits": 0,
+    "disk_hits": 0,
+    "misses": 0,
+    "memory_evictions": 0,
+    "disk_evictions": 0,
+}
+
+
+def is_enabled():
+    return getattr(settings, "OCR_CACHE_ENABLED", True)
+
+
+def get_cache_dir():
+    default = os.path.join(os.path.expanduser("~"), ".cache", "scan2heal", "ocr")
+    return str(getattr(settings, "OCR_CACHE_DIR", default))
+
+
+def ocr_config_fingerprint():
+    """Everything besides the file bytes that changes the OCR output."""
+    return json.dumps({
+        "pipeline": OCR_PIPELINE_VERSION,
+        "engine": getattr(settings, "OCR_CACHE_ENGINE_VERSION", ""),
+        "backend": getattr(settings, "OCR_BACKEND", "auto"),
+        "dpi": getattr(settings, "OCR_PDF_DPI", 200),
+        "text_layer": getattr(settings, "OCR_USE_TEXT_LAYER", True),
+        "text_layer_min_chars": getattr(settings, "OCR_TEXT_LAYER_MIN_CHARS", 50),
+        "preprocess": list(getattr(settings, "OCR_PREPROCESS", [])),
+        "preprocess_dpi": getattr(settings, "OCR_PREPROCESS_TARGET_DPI", 300),
+    }, sort_keys=True)
+
+
+def key_for_upload(file):
+    """sha256 of the upload bytes + extension + OCR config. Rewinds the file."""
+    digest = hashlib.sha256()
+    digest.update(ocr_config_fingerprint().encode("utf-8"))
+    digest.update(os.path.splitext(file.name)[1].lower().encode("utf-8"))
+
+    if hasattr(file, "chunks"):
+        for chunk in file.chunks():
+            digest.update(chunk)
+    else:
+        file.seek(0)
+        for chunk in iter(lambda: file.read(64 * 1024), b""):
+            digest.update(chunk)
+
+    file.seek(0)
+    return digest.hexdigest()
+
+
+# ======== Memory Tier (LRU) =========
+def _memory_get(key):
+    with _lock:
+        entry = _memory.get(key)
+        if entry is None:
+            return None
+        _memory.move_to_end(key)
+        return entry[0]
+
+
+def _memory_set(key, result, size):
+    global _memory_bytes
+    limit = getattr(settings, "OCR_CACHE_MEMORY_BYTES", 32 * 1024 * 1024)
+    if size > limit:
+        return
+
+    with _lock:
+        if key in _memory:
+            _memory_bytes -= _memory.pop(key)[1]
+        _memory[key] = (result, size)
+        _memory_bytes += size
+
+        while _memory_bytes > limit:
+            _, (_, evicted_size) = _memory.popitem(last=False)
+            _memory_bytes -= evicted_size
+            stats["memory_evictions"] += 1
+
+
+# ======== Disk Tier =========
+def _disk_path(key):
+    return os.path.join(get_cache_dir(), key[:2], f"{key}.json")
+
+
+def _iter_disk_entries():
+    root = get_cache_dir()
+    if not os.path.isdir(root):
+        return
+    for shard in os.scandir(root):
+        if shard.is_dir():
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".json"):
+                    yield entry
+
+
+def _disk_get(key):
+    path = _disk_path(key)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            result = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    # mtime doubles as "last used" for eviction
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return result
+
+
+def _disk_set(key, payload):
+    global _disk_bytes
+    path = _disk_path(key)
+    # Report text: readable by this user only
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+    with _lock:
+        if _disk_bytes is None:
+            _disk_bytes = sum(e.stat().st_size for e in _iter_disk_entries())
+        else:
+            _disk_bytes += len(payload)
+        over_limit = _disk_bytes > getattr(settings, "OCR_CACHE_DISK_BYTES", 512 * 1024 * 1024)
+
+    if over_limit:
+        _evict_disk()
+
+
+def _evict_disk():
+    """Drop least recently used files until the tier is back under 90% of its limit."""
+    global _disk_bytes
+    limit = getattr(settings, "OCR_CACHE_DISK_BYTES", 512 * 1024 * 1024)
+    entries = sorted(
+        ((e.stat().st_mtime, e.stat().st_size, e.path) for e in _iter_disk_entries())
+    )
+    total = sum(size for _, size, _ in entries)
+
+    evicted = 0
+    for _, size, path in entries:
+        if total <= limit * 0.9:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        evicted += 1
+
+    with _lock:
+        _disk_bytes = total
+        stats["disk_evictions"] += evicted
+    logger.info("OCR cache: evicted %d files from disk, %s", evicted, cache_stats())
+
+
+# ======== Public API =========
+def _count(name):
+    with _lock:
+        stats[name] += 1
+
+
+def lookup(key):
+    result = _memory_get(key)
+    if result is not None:
+        _count("memory_hits")
+        return dict(result)
+
+    result = _disk_get(key)
+    if result is not None:
+        _count("disk_hits")
+        _memory_set(key, result, len(result.get("text", "")))
+        return dict(result)
+
+    _count("misses")
+    return None
+
+
+def store(key, result):
+    payload = json.dumps(result)
+    _memory_set(key, result, len(result.get("text", "")))
+    try:
+        _disk_set(key, payload)
+    except OSError:
+        # A read-only or full disk shouldn't fail the request
+        pass
+
+
+def clear():
+    global _memory_bytes, _disk_bytes
+    with _lock:
+        _memory.clear()
+        _memory_bytes = 0
+    for entry in list(_iter_disk_entries()):
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+    with _lock:
+        _disk_bytes = 0
+
+
+def cache_stats():
+    with _lock:
+        return {
+            **stats,
+            "memory_entries": len(_memory),
+            "memory_bytes": _memory_bytes,
+            "disk_bytes": _disk_bytes,
+        }
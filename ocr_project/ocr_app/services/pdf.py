@@ -0,0 +1,92 @@
+# services/pdf.py
+# Imported on first PDF download, so reportlab and the font are only loaded
+# by the code paths that render reports
+import os
+from io import BytesIO
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+font_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'NotoSansDevanagari-Regular.ttf')
+
+# ✅ Register the font with ReportLab
+pdfmetrics.registerFont(TTFont('NotoHindi', font_path))
+
+
+def generate_diagnosis_pdf(disease_name, prediction_data, thresholds=None, medicines=None, show_threshold_only=False, final_decision=None):
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4)
+    width, height = A4
+    y = height - 50
+
+    # Header
+    c.setFont("Helvetica-Bold", 16)
+    c.drawString(50, y, "🩺 Scan2Heal - Diagnostic Report")
+    y -= 40
+
+    c.setFont("Helvetica", 12)
+    c.drawString(50, y, f"Disease: {disease_name}")
+    y -= 20
+    c.drawString(50, y, f"Final Decision: {final_decision}")
+    y -= 30
+
+    # Severity
+    c.setFont("Helvetica-Bold", 14)
+    c.drawString(50, y, "Severity:")
+    y -= 20
+    c.setFont("Helvetica", 12)
+    c.drawString(60, y, prediction_data.get("severity", "N/A"))
+    y -= 30
+
+    # Threshold Status
+    if not show_threshold_only:
+        c.setFont("Helvetica-Bold", 14)
+        c.drawString(50, y, "Threshold Status:")
+        y -= 20
+        c.setFont("Helvetica", 12)
+        c.drawString(60, y, prediction_data.get("threshold_status", "N/A"))
+        y -= 20
+
+    # Threshold Parameters
+    threshold_data = prediction_data.get("threshold_details", {})
+    if threshold_data:
+        c.setFont("Helvetica-Bold", 14)
+        c.drawString(50, y, "Threshold Parameters:")
+        y -= 20
+        c.setFont("Helvetica", 12)
+        for param, obj in threshold_data.items():
+            val = obj.get("value", "None")
+            status = obj.get("status", "unknown")
+            c.drawString(60, y, f"{param}: {val} → {status}")
+            y -= 15
+        y -= 10
+
+    # Recommendations
+    recommendations = prediction_data.get("recommendations", [])
+    if recommendations:
+        c.setFont("Helvetica-Bold", 14)
+        c.drawString(50, y, "Recommendations:")
+        y -= 20
+        c.setFont("Helvetica", 12)
+        for rec in recommendations:
+            c.drawString(60, y, f"- {rec}")
+            y -= 15
+        y -= 10
+
+    # Medicines
+    if medicines:
+        c.setFont("Helvetica-Bold", 14)
+        c.drawString(50, y, "Medicines:")
+        y -= 20
+        c.setFont("Helvetica", 12)
+        for med in medicines:
+            name = med.get("name", "Unnamed")
+            link = med.get("link", "No Link")
+            c.drawString(60, y, f"{name} - {link}")
+            y -= 15
+
+    c.save()
+    buffer.seek(0)
+    return buffer  # ✅ Return the full buffer, not .getvalue()
@@ -0,0 +1,132 @@
+# services/preprocess.py
+import time
+
+import numpy as np
+from PIL import Image
+from django.conf import settings
+
+# Long side of an A4 page in inches, used to turn a target DPI into pixels
+# for phone photos that carry no DPI information
+PAGE_LONG_SIDE_INCHES = 11.69
+
+DEFAULT_PIPELINE = ["draft", "downscale", "grayscale"]
+AVAILABLE_STAGES = ["draft", "downscale", "grayscale", "binarize", "deskew"]
+
+
+def get_pipeline():
+    pipeline = getattr(settings, "OCR_PREPROCESS", DEFAULT_PIPELINE)
+    unknown = [stage for stage in pipeline if stage not in AVAILABLE_STAGES]
+    if unknown:
+        raise ValueError(f"Unknown OCR pre-processing stage(s): {unknown}")
+    return list(pipeline)
+
+
+def get_target_long_side():
+    dpi = int(getattr(settings, "OCR_PREPROCESS_TARGET_DPI", 300))
+    return int(dpi * PAGE_LONG_SIDE_INCHES)
+
+
+# ======== Stages =========
+def draft(img):
+    # JPEG only: let the decoder downsample by a power of two while decoding,
+    # which is far cheaper than decoding 12MP and resizing afterwards
+    if img.format != "JPEG":
+        return img
+    scale = get_target_long_side() / max(img.size)
+    if scale < 1:
+        mode = "L" if "grayscale" in get_pipeline() else img.mode
+        img.draft(mode, (int(img.size[0] * scale), int(img.size[1] * scale)))
+    return img
+
+
+def downscale(img):
+    scale = get_target_long_side() / max(img.size)
+    if scale >= 1:
+        return img
+    size = (max(1, int(img.size[0] * scale)), max(1, int(img.size[1] * scale)))
+    return img.resize(size, Image.LANCZOS)
+
+
+def grayscale(img):
+    return img if img.mode == "L" else img.convert("L")
+
+
+def otsu_threshold(gray):
+    hist = gray.histogram()[:256]
+    total = sum(hist)
+    sum_all = sum(i * h for i, h in enumerate(hist))
+
+    best_t, best_var = 127, -1.0
+    weight_bg = sum_bg = 0
+    for t, h in enumerate(hist):
+        weight_bg += h
+        if weight_bg == 0:
+            continue
+        weight_fg = total - weight_bg
+        if weight_fg == 0:
+            break
+        sum_bg += t * h
+        mean_bg = sum_bg / weight_bg
+        mean_fg = (sum_all - sum_bg) / weight_fg
+        var = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        if var > best_var:
+            best_t, best_var = t, var
+    return best_t
+
+
+def binarize(img):
+    gray = grayscale(img)
+    t = otsu_threshold(gray)
+    return gray.point([255 if p > t else 0 for p in range(256)])
+
+
+def estimate_skew(img, max_angle=5.0, step=0.5):
+    """Angle (degrees) that makes text rows most horizontal, by projection profile."""
+    thumb = grayscale(img).copy()
+    thumb.thumbnail((800, 800))
+    t = otsu_threshold(thumb)
+    ink = thumb.point([255 if p <= t else 0 for p in range(256)])
+
+    best_angle, best_score = 0.0, -1.0
+    for angle in np.arange(-max_angle, max_angle + step / 2, step):
+        rows = np.asarray(ink.rotate(float(angle)), dtype=np.float32).sum(axis=1)
+        score = float(np.square(np.diff(rows)).sum())
+        if score > best_score:
+            best_angle, best_score = float(angle), score
+    return best_angle
+
+
+def deskew(img):
+    angle = estimate_skew(img)
+    if abs(angle) < 0.1:
+        return img
+    fill = 255 if img.mode == "L" else (255,) * len(img.getbands())
+    return img.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=fill)
+
+
+STAGES = {
+    "draft": draft,
+    "downscale": downscale,
+    "grayscale": grayscale,
+    "binarize": binarize,
+    "deskew": deskew,
+}
+
+
+def open_image(file):
+    """
+    Open an uploaded photo and run the configured pre-processing pipeline
+    (OCR_PREPROCESS) over it. Returns (image, {stage: seconds}).
+    """
+    timings = {}
+    img = Image.open(file)
+
+    for stage in get_pipeline():
+        start = time.perf_counter()
+        img = STAGES[stage](img)
+        if stage == "draft":
+            # Decoding happens here, so the draft gain shows up in its timing
+            img.load()
+        timings[stage] = round(time.perf_counter() - start, 4)
+
+    return img, timings
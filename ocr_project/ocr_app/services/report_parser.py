@@ -0,0 +1,335 @@
+# services/report_parser.py
+import re
+import bisect
+import threading
+
+from django.conf import settings
+
+# ======== Parameter Tables =========
+# Threshold parameters checked by check_report_status, per disease
+REPORT_THRESHOLDS = {
+    "diabetes": {
+        "FBS": {
+            "aliases": ["FBS", "Fasting Blood Sugar", "Fasting Glucose", "GLUCOSE, FASTING", "Glucose Fasting"],
+            "ranges": {
+                "ok": (0, 99),
+                "prediabetes": (100, 125),
+                "abnormal": (126, float("inf"))
+            }
+        },
+        "HbA1c": {
+            "aliases": ["HbA1c", "A1C", "Glycated Hemoglobin", "GLYCOSYLATED HEMOGLOBIN"],
+            "ranges": {
+                "ok": (0, 5.6),
+                "prediabetes": (5.7, 6.4),
+                "abnormal": (6.5, float("inf"))
+            }
+        },
+        "Glucose": {
+            "aliases": ["Glucose", "RBS", "Random Blood Sugar", "Blood Sugar"],
+            "ranges": {
+                "ok": (0, 99),
+                "prediabetes": (100, 125),
+                "abnormal": (126, float("inf"))
+            }
+        }
+    },
+    "kidney": {
+        "Creatinine": {"aliases": ["Creatinine", "Serum Creatinine"], "max": 1.3},
+        "Urea": {"aliases": ["Urea", "Blood Urea"], "max": 43},
+        "Sodium": {"aliases": ["Sodium", "Na+"], "min": 135, "max": 145},
+        "Potassium": {"aliases": ["Potassium", "K+"], "max": 5.0}
+    },
+    "liver": {
+        "Total Bilirubin": {"aliases": ["Total Bilirubin", "Bilirubin Total"], "max": 1.2},
+        "Direct Bilirubin": {"aliases": ["Direct Bilirubin", "Bilirubin Direct"], "max": 0.2},
+        "AST": {"aliases": ["AST", "SGOT"], "max": 35},
+        "ALT": {"aliases": ["ALT", "SGPT"], "max": 45},
+        "Alkaline Phosphatase": {"aliases": ["Alkaline Phosphatase", "ALP"], "min": 40, "max": 129}
+    },
+    "heart": {
+        "EF": {"aliases": ["EF", "Ejection Fraction"], "min": 55},
+        "PASP": {"aliases": ["PASP"], "max": 35},
+        "Peak TR Velocity": {"aliases": ["Peak TR Velocity"], "max": 2.8}
+    },
+    "dengue": {
+        "WBC": {"aliases": ["WBC", "WBC Count"], "min": 4000, "max": 11000},
+        "Platelets": {"aliases": ["Platelet Count", "Platelets"], "min": 150000},
+        "IgM": {"aliases": ["IgM", "DENGUE FEVER ANTIBODY, IgM"], "min": 1.1},
+        "IgG": {"aliases": ["IgG", "DENGUE FEVER ANTIBODY, IgG"], "min": 2.2}
+    },
+    "thyroid": {
+        "TSH": {"aliases": ["TSH", "Thyroid Stimulating Hormone"], "min": 0.4, "max": 4.5}
+    }
+}
+
+# Report labels for the model input columns used by match_parameters
+FEATURE_SYNONYMS = {
+    "diabetes": {
+        "Pregnancies": ["Pregnancies"],
+        "Glucose": ["Glucose", "RBS", "Random Blood Sugar", "Blood Sugar"],
+        "BloodPressure": ["BloodPressure", "BP"],
+        "SkinThickness": ["SkinThickness"],
+        "Insulin": ["Insulin"],
+        "BMI": ["BMI"],
+        "DiabetesPedigreeFunction": ["DiabetesPedigreeFunction"],
+        "Age": ["Age"],
+        "FBS": ["FBS", "Fasting Blood Sugar", "Fasting Glucose", "GLUCOSE, FASTING", "Glucose Fasting"],
+        "HbA1c": ["HbA1c", "Glycated Hemoglobin", "A1C"]
+    },
+    "kidney": {
+        "age": ["Age"],
+        "bp": ["BP", "Blood Pressure"],
+        "sg": ["Specific Gravity", "SG"],
+        "al": ["Albumin"],
+        "su": ["Sugar"],
+        "rbc": ["RBC"],
+        "pc": ["Pus Cells"],
+        "pcc": ["Pus Cell Clumps"],
+        "ba": ["Bacteria"],
+        "bgr": ["Blood Glucose Random", "BGR"],
+        "bu": ["Blood Urea", "BU"],
+        "sc": ["Serum Creatinine", "SC"],
+        "sod": ["Sodium", "Na+"],
+        "pot": ["Potassium", "K+"],
+        "hemo": ["Hemoglobin", "HGB", "HB"],
+        "pcv": ["Packed Cell Volume", "PCV"],
+        "wc": ["WBC Count", "WC"],
+        "rc": ["RBC Count", "RC"]
+    },
+    "liver": {
+        "Age": ["Age"],
+        "Gender": ["Sex", "Gender"],
+        "Total_Bilirubin": ["Total Bilirubin", "Bilirubin Total", "SERUM BILIRUBIN (TOTAL)"],
+        "Direct_Bilirubin": ["Direct Bilirubin", "Bilirubin Direct", "SERUM BILIRUBIN (DIRECT)"],
+        "Alkaline_Phosphotase": ["Alkaline Phosphatase", "ALK PHOS", "ALP"],
+        "Alamine_Aminotransferase": ["ALT", "SGPT", "ALT (SGPT)"],
+        "Aspartate_Aminotransferase": ["AST", "SGOT"],
+        "Total_Protiens": ["Total Protein", "TP"],
+        "Albumin": ["Albumin", "ALB"],
+        "Albumin_and_Globulin_Ratio": ["A/G", "AG Ratio", "Albumin/Globulin Ratio","(A/G)Ratio"]
+    },
+    "dengue": {
+        "WBC": ["WBC Count", "White Blood Cells"],
+        "Platelets": ["Platelet Count", "Platelets"],
+        "Hemoglobin": ["Hemoglobin", "Hb", "HGB"],
+        "RBC": ["RBC Count", "RBC"],
+        "HCT": ["Hematocrit", "HCT"],
+        "NS1": ["NS1 Antigen"],
+        "IgM": ["IgM", "DENGUE IgM"],
+        "IgG": ["IgG", "DENGUE IgG"]
+    }
+}
+
+# Columns without an entry in FEATURE_SYNONYMS are looked up by their own name
+_feature_columns = {}
+# Aliases of threshold tables published through services/model_store.py
+_threshold_aliases = set()
+
+DECIMAL_RE = re.compile(r"-?\d+\.\d+")
+FEATURE_VALUE_RE = re.compile(r"\s*[:\-]?\s*(\d+\.?\d*)")
+DIGIT_RE = re.compile(r"\d")
+
+
+def trie_regex(words):
+    """
+    Regex matching the longest of `words` at a position. Alternatives are
+    factored into a trie, so each position costs O(longest word) instead
+    of O(number of words).
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node):
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # Greedy optional: longer aliases win over their own prefixes
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class AliasIndex:
+    """
+    Every alias of every disease compiled into one regex. scan() walks the
+    text once and records, per alias, where it first occurs and the first
+    value that follows it in match_parameters style.
+    """
+
+    def __init__(self, aliases):
+        self.aliases = sorted({a.lower() for a in aliases if a})
+        # Aliases that start at the same position as a longer match
+        self.prefixes = {
+            alias: [other for other in self.aliases if alias.startswith(other)]
+            for alias in self.aliases
+        }
+        self.pattern = re.compile(f"(?=({trie_regex(self.aliases)}))", re.IGNORECASE)
+
+    def scan(self, text):
+        max_chars = int(getattr(settings, "REPORT_SCAN_MAX_CHARS", 1_000_000))
+        text = text[:max_chars]
+
+        first_end = {}
+        feature_values = {}
+        # No digits means no values, don't bother matching labels
+        if DIGIT_RE.search(text):
+            for match in self.pattern.finditer(text):
+                start = match.start()
+                longest = match.group(1).lower()
+                for alias in self.prefixes[longest]:
+                    end = start + len(alias)
+                    first_end.setdefault(alias, end)
+                    if alias not in feature_values:
+                        value = FEATURE_VALUE_RE.match(text, end)
+                        if value:
+                            feature_values[alias] = float(value.group(1))
+
+        return ReportScan(text, first_end, feature_values, self)
+
+
+class ReportScan:
+    """Result of one AliasIndex.scan() over a report."""
+
+    def __init__(self, text, first_end, feature_values, index):
+        self.text = text
+        self.first_end = first_end
+        self.feature_values = feature_values
+        self.index = index
+        self._decimals = None
+
+    def _decimal_after(self, pos):
+        # Same value `alias.*?(-?\d+\.\d+)` would capture
+        match = DECIMAL_RE.match(self.text, pos)
+        if match:
+            return float(match.group())
+
+        if self._decimals is None:
+            self._decimals = [(m.start(), m.group()) for m in DECIMAL_RE.finditer(self.text)]
+        i = bisect.bisect_left(self._decimals, (pos, ""))
+        return float(self._decimals[i][1]) if i < len(self._decimals) else None
+
+    def threshold_value(self, aliases):
+        """First decimal after the first alias (in alias order) that has one."""
+        return self.threshold_match(aliases)[0]
+
+    def threshold_match(self, aliases):
+        """
+        (value, rank) of threshold_value, rank being the position of the
+        alias it came from among the non-empty `aliases`; (None, None) if
+        no alias has a value. Only a rank 0 value is final: more text can
+        still bring a higher-priority alias for any other.
+        """
+        aliases = [alias.lower() for alias in aliases if alias]
+        for rank, alias in enumerate(aliases):
+            if alias in self.index.prefixes:
+                end = self.first_end.get(alias)
+            else:
+                # Not indexed, fall back to a plain search
+                found = re.search(re.escape(alias), self.text, re.IGNORECASE)
+                end = found.end() if found else None
+            if end is not None:
+                value = self._decimal_after(end)
+                if value is not None:
+                    return value, rank
+        return None, None
+
+    def feature_value(self, aliases):
+        """`alias: 12.3` style value for the first alias that has one."""
+        for alias in aliases:
+            alias = alias.lower()
+            if not alias:
+                continue
+            if alias in self.index.prefixes:
+                value = self.feature_values.get(alias)
+            else:
+                found = re.search(re.escape(alias) + FEATURE_VALUE_RE.pattern, self.text, re.IGNORECASE)
+                value = float(found.group(1)) if found else None
+            if value is not None:
+                return value
+        return None
+
+    def thresholds(self, disease, table=None):
+        table = REPORT_THRESHOLDS if table is None else table
+        return {
+            key: self.threshold_value(limits.get("aliases", [key]))
+            for key, limits in table.get(disease.lower(), {}).items()
+        }
+
+    def features(self, disease, columns=None):
+        synonyms = FEATURE_SYNONYMS.get(disease.lower(), {})
+        columns = columns or _feature_columns.get(disease.lower()) or list(synonyms)
+        return {col: self.feature_value(synonyms.get(col, [col])) for col in columns}
+
+    def as_dict(self):
+        """Every threshold and model parameter found, for every disease."""
+        diseases = set(REPORT_THRESHOLDS) | set(FEATURE_SYNONYMS) | set(_feature_columns)
+        return {
+            disease: {
+                "thresholds": self.thresholds(disease),
+                "features": self.features(disease),
+            }
+            for disease in sorted(diseases)
+        }
+
+
+# ======== Shared Index =========
+_index = None
+_index_lock = threading.Lock()
+
+
+def all_aliases():
+    aliases = set()
+    for params in REPORT_THRESHOLDS.values():
+        for key, limits in params.items():
+            aliases.update(limits.get("aliases", [key]))
+    for disease, synonyms in FEATURE_SYNONYMS.items():
+        for names in synonyms.values():
+            aliases.update(names)
+    for disease, columns in _feature_columns.items():
+        synonyms = FEATURE_SYNONYMS.get(disease, {})
+        for col in columns:
+            aliases.update(synonyms.get(col, [col]))
+    return aliases | _threshold_aliases
+
+
+def get_report_index():
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = AliasIndex(all_aliases())
+        return _index
+
+
+def register_feature_columns(disease, columns):
+    """Add a model's input columns to the index (rebuilt on next use if new)."""
+    global _index
+    disease = disease.lower()
+    with _index_lock:
+        if _feature_columns.get(disease) != list(columns):
+            _feature_columns[disease] = list(columns)
+            _index = None
+
+
+def register_threshold_aliases(table):
+    """Add the aliases of a threshold table to the index (rebuilt on next use if new)."""
+    global _index
+    new = {alias for params in table.values() for key, limits in params.items()
+           for alias in limits.get("aliases", [key])}
+    with _index_lock:
+        if not new <= _threshold_aliases:
+            _threshold_aliases.update(new)
+            _index = None
+
+
+def scan_report(text):
+    return get_report_index().scan(text or "")
+
+
+# Compile once at import
+get_report_index()
@@ -0,0 +1,214 @@
+# services/side_effects.py
+import io
+import json
+import logging
+import zipfile
+import threading
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from ..models import SideEffectLabel
+
+logger = logging.getLogger(__name__)
+
+NOT_FOUND = ["No side effects found."]
+
+# Longest drug name the store keeps (SideEffectLabel.name)
+MAX_NAME_LENGTH = SideEffectLabel._meta.get_field("name").max_length
+
+# Set in the shared cache, per upstream, while it backs off after a failure
+BACKOFF_KEY = "side_effects:backoff:{upstream}"
+
+
+def drug_key(name):
+    return " ".join(name.split()).lower()
+
+
+def backoff_key():
+    return BACKOFF_KEY.format(upstream=getattr(settings, "SIDE_EFFECTS_UPSTREAM", ""))
+
+
+def label_side_effects(label):
+    """Adverse reactions of an openFDA drug label, else its warnings, as a list (None if neither)."""
+    side_effects = label.get("adverse_reactions") or label.get("warnings")
+    if isinstance(side_effects, str):
+        return [side_effects]
+    return side_effects or None
+
+
+# ======== Upstreams =========
+# SIDE_EFFECTS_UPSTREAM is the dotted path of a class with fetch(name) ->
+# list of side effects, or None when the drug has no label. Errors are
+# raised. An empty setting runs offline on the store alone.
+class OpenFDAUpstream:
+    """api.fda.gov drug label search over one pooled HTTP session."""
+    url = "https://api.fda.gov/drug/label.json"
+
+    def __init__(self):
+        import requests
+        self.session = requests.Session()
+        self.timeout = getattr(settings, "SIDE_EFFECTS_TIMEOUT", 5)
+
+    def fetch(self, name):
+        params = {"search": f"openfda.generic_name:{name}", "limit": 1}
+        response = self.session.get(self.url, params=params, timeout=self.timeout)
+        if response.status_code == 404:
+            # openFDA answers "no matches" with a 404
+            return None
+        response.raise_for_status()
+        results = response.json().get("results")
+        return label_side_effects(results[0]) if results else None
+
+
+class LabelDumpUpstream:
+    """Answers from a local openFDA label dump (SIDE_EFFECTS_LABEL_DUMP), e.g. in tests."""
+
+    def __init__(self):
+        self.labels = dict(read_label_dump(settings.SIDE_EFFECTS_LABEL_DUMP))
+
+    def fetch(self, name):
+        return self.labels.get(drug_key(name))
+
+
+def read_label_dump(path):
+    """
+    (drug key, side effects) for every generic name in an openFDA
+    drug-label download (.json or .json.zip). A drug keeps its first label
+    with adverse reactions, else its first label with warnings.
+    """
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            names = [n for n in archive.namelist() if n.endswith(".json")]
+            with archive.open(names[0]) as f:
+                data = json.load(io.TextIOWrapper(f, encoding="utf-8"))
+    else:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+
+    labels = {}
+    for label in data.get("results", []):
+        side_effects = label_side_effects(label)
+        if not side_effects:
+            continue
+        has_reactions = bool(label.get("adverse_reactions"))
+        for generic in label.get("openfda", {}).get("generic_name", []):
+            key = drug_key(generic)
+            if key not in labels or (has_reactions and not labels[key][1]):
+                labels[key] = (side_effects, has_reactions)
+    return [(key, side_effects) for key, (side_effects, _) in labels.items()]
+
+
+# ======== Store =========
+class SideEffectStore:
+    """
+    SideEffectLabel rows in front of the upstream. Entries newer than
+    SIDE_EFFECTS_TTL (SIDE_EFFECTS_MISS_TTL for drugs without a label) are
+    served as is; older ones up to SIDE_EFFECTS_STALE_TTL are served while
+    a background thread refreshes them; anything older, or missing, is
+    fetched inline. A failing upstream falls back to whatever is stored,
+    and isn't called again by any worker for SIDE_EFFECTS_BACKOFF_SECONDS,
+    so an outage costs one timeout instead of one per request.
+    """
+
+    def __init__(self):
+        self._upstream = None
+        self._executor = None
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    @property
+    def upstream(self):
+        path = getattr(settings, "SIDE_EFFECTS_UPSTREAM", "")
+        if not path:
+            return None
+        with self._lock:
+            if self._upstream is None or self._upstream[0] != path:
+                self._upstream = (path, import_string(path)())
+            return self._upstream[1]
+
+    def get(self, name):
+        key = drug_key(name)
+        if not key or len(key) > MAX_NAME_LENGTH:
+            return NOT_FOUND
+        entry = SideEffectLabel.objects.filter(name=key).first()
+        upstream = self.upstream
+        if entry is not None:
+            age = timezone.now() - entry.fetched_at
+            ttl = getattr(settings, "SIDE_EFFECTS_TTL" if entry.found else "SIDE_EFFECTS_MISS_TTL", 0)
+            if upstream is None or age <= timedelta(seconds=ttl):
+                return entry.side_effects
+            if age <= timedelta(seconds=getattr(settings, "SIDE_EFFECTS_STALE_TTL", 0)):
+                self.refresh_later(key)
+                return entry.side_effects
+
+        if upstream is None:
+            return NOT_FOUND
+        error = cache.get(backoff_key())
+        if error is None:
+            try:
+                return self.refresh(key, upstream).side_effects
+            except Exception as e:
+                error = str(e) or type(e).__name__
+        if entry is not None:
+            return entry.side_effects
+        return [f"API error: {error}"]
+
+    def refresh(self, key, upstream=None):
+        try:
+            side_effects = (upstream or self.upstream).fetch(key)
+        except Exception as e:
+            logger.warning("Side effect lookup for %s failed, backing off: %s", key, e)
+            cache.set(backoff_key(), str(e) or type(e).__name__,
+                      getattr(settings, "SIDE_EFFECTS_BACKOFF_SECONDS", 60))
+            raise
+        entry, _ = SideEffectLabel.objects.update_or_create(name=key, defaults={
+            "side_effects": side_effects or NOT_FOUND,
+            "found": bool(side_effects),
+            "source": "upstream",
+            "fetched_at": timezone.now(),
+        })
+        return entry
+
+    def refresh_later(self, key):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="side-effects")
+        self._executor.submit(self._background_refresh, key)
+
+    def _background_refresh(self, key):
+        close_old_connections()
+        try:
+            if cache.get(backoff_key()) is None:
+                self.refresh(key)
+        except Exception as e:
+            logger.warning("Background side effect refresh for %s failed: %s", key, e)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+            close_old_connections()
+
+
+side_effect_store = SideEffectStore()
+
+
+def import_label_dump(path, batch_size=1000):
+    """Upsert every drug of a label dump into the store; returns the number of drugs."""
+    now = timezone.now()
+    rows = [
+        SideEffectLabel(name=key, side_effects=side_effects, found=True, source="import", fetched_at=now)
+        for key, side_effects in read_label_dump(path)
+    ]
+    SideEffectLabel.objects.bulk_create(
+        rows, batch_size=batch_size, update_conflicts=True, unique_fields=["name"],
+        update_fields=["side_effects", "found", "source", "fetched_at"]
+    )
+    return len(rows)
@@ -0,0 +1,389 @@
+# services/symptom_catalog.py
+import re
+import time
+import difflib
+import hashlib
+import threading
+from contextlib import contextmanager
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import Length
+
+from ..models import Disease, Medicine, Symptom
+
+
+# ======== Catalog Version =========
+# The Symptom/Disease/Medicine catalog changes rarely (`manage.py i_symp`,
+# `manage.py i_med`, admin). Its version combines a counter in the shared
+# cache, bumped by the model signals in ocr_app/signals.py from whichever
+# process makes the change, with a fingerprint of the tables for writes
+# that bypass signals (bulk loads, raw SQL). Both are re-read at most
+# every SYMPTOM_CATALOG_POLL_SECONDS, or at once after a local change, so
+# every worker computes the same version for the same catalog.
+VERSION_KEY = "symptom_catalog:changes"
+_state = None
+_checked_at = 0.0
+_version_lock = threading.Lock()
+
+
+def catalog_fingerprint():
+    symptoms = Symptom.objects.aggregate(n=Count("id"), last=Max("id"), chars=Sum(Length("name")))
+    diseases = Disease.objects.aggregate(n=Count("id"), last=Max("id"), chars=Sum(Length("name")))
+    links = Symptom.diseases.through.objects.aggregate(n=Count("id"), last=Max("id"))
+    medicines = Medicine.objects.aggregate(
+        n=Count("id"), last=Max("id"), chars=Sum(Length("name")), link_chars=Sum(Length("link"))
+    )
+    return (tuple(sorted(symptoms.items())) + tuple(sorted(diseases.items()))
+            + tuple(sorted(links.items())) + tuple(sorted(medicines.items())))
+
+
+# Set while a bulk import runs in this thread, see deferred_catalog_bumps()
+_deferred = threading.local()
+
+
+def bump_catalog_version(**kwargs):
+    """Signal receiver: the catalog changed."""
+    # m2m_changed fires pre_* and post_*; count each change once
+    if not kwargs.get("action", "post_").startswith("post_"):
+        return
+    if getattr(_deferred, "depth", 0):
+        _deferred.changed = True
+        return
+    _bump()
+
+
+def _bump():
+    global _checked_at
+    if not cache.add(VERSION_KEY, 1, timeout=None):
+        try:
+            cache.incr(VERSION_KEY)
+        except ValueError:
+            # Expired or culled between add() and incr()
+            cache.add(VERSION_KEY, 1, timeout=None)
+    with _version_lock:
+        _checked_at = 0.0
+
+
+@contextmanager
+def deferred_catalog_bumps():
+    """
+    Count every catalog change this thread makes inside the block as one
+    bump, made when the block exits. Bulk imports (`i_symp`, `i_med`) save
+    thousands of rows, each a signal and a shared cache round trip otherwise.
+    """
+    depth = getattr(_deferred, "depth", 0)
+    if not depth:
+        _deferred.changed = False
+    _deferred.depth = depth + 1
+    try:
+        yield
+    finally:
+        _deferred.depth = depth
+        if not depth and _deferred.changed:
+            _bump()
+
+
+def catalog_version():
+    """Short string that changes whenever the symptom catalog does, the same in every process."""
+    global _state, _checked_at
+    poll_seconds = getattr(settings, "SYMPTOM_CATALOG_POLL_SECONDS", 5)
+    with _version_lock:
+        if _state is None or time.monotonic() - _checked_at >= poll_seconds:
+            _state = (catalog_fingerprint(), cache.get(VERSION_KEY, 0))
+            _checked_at = time.monotonic()
+        raw = repr(_state)
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+
+# ======== Fuzzy Symptom Index =========
+def normalize(name):
+    """Lowercase, underscores as spaces, single spaces: 'Skin_Rash ' -> 'skin rash'."""
+    return re.sub(r"[\s_]+", " ", name).strip().lower()
+
+
+def ngrams(text, n=3):
+    padded = f"  {text} "
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+class SymptomIndex:
+    """
+    Trigram inverted index over the symptom names. A lookup only compares
+    the input with names sharing trigrams with it, instead of every name;
+    candidates are ranked with difflib's ratio, as get_close_matches does.
+    """
+
+    def __init__(self, names, candidates=10):
+        self.names = list(names)
+        self.candidates = candidates
+        self.normalized = [normalize(name) for name in self.names]
+        self.exact = {}
+        self.postings = defaultdict(list)
+        self.sizes = []
+        for i, key in enumerate(self.normalized):
+            self.exact.setdefault(key, i)
+            grams = ngrams(key)
+            self.sizes.append(len(grams))
+            for gram in grams:
+                self.postings[gram].append(i)
+
+    def search(self, query, k=5, cutoff=0.6):
+        """Top-k (name, score) matches for `query`, best first."""
+        key = normalize(query)
+        if not key:
+            return []
+        if key in self.exact:
+            i = self.exact[key]
+            return [(self.names[i], 1.0)] + [m for m in self._ranked(key, k, cutoff) if m[0] != self.names[i]][:k - 1]
+        return self._ranked(key, k, cutoff)
+
+    def _ranked(self, key, k, cutoff):
+        grams = ngrams(key)
+        shared = defaultdict(int)
+        for gram in grams:
+            for i in self.postings.get(gram, ()):
+                shared[i] += 1
+
+        # Dice coefficient on trigrams picks the candidates worth a full comparison
+        candidates = sorted(shared, key=lambda i: -2 * shared[i] / (len(grams) + self.sizes[i]))[:self.candidates]
+
+        matcher = difflib.SequenceMatcher()
+        matcher.set_seq2(key)
+        scored = []
+        for i in candidates:
+            matcher.set_seq1(self.normalized[i])
+            if matcher.real_quick_ratio() >= cutoff and matcher.quick_ratio() >= cutoff:
+                ratio = matcher.ratio()
+                if ratio >= cutoff:
+                    scored.append((self.names[i], round(ratio, 4)))
+        # Ties resolved like get_close_matches: by name, descending
+        scored.sort(reverse=True, key=lambda m: (m[1], m[0]))
+        return scored[:k]
+
+    def best(self, query, cutoff=0.6):
+        matches = self.search(query, k=1, cutoff=cutoff)
+        return matches[0][0] if matches else None
+
+
+# ======== Disease x Symptom Matrix =========
+class IncidenceMatrix:
+    """
+    Sparse (disease x symptom) 0/1 matrix of the Symptom.diseases links.
+    Ranking a symptom list is one sparse row-sum over its columns.
+    """
+
+    def __init__(self, symptom_ids, symptom_names):
+        import numpy as np
+        from scipy import sparse
+
+        diseases = list(Disease.objects.order_by("id").values_list("id", "name"))
+        links = list(Symptom.diseases.through.objects.values_list("disease_id", "symptom_id"))
+
+        self.disease_names = [name for _, name in diseases]
+        self.symptom_names = list(symptom_names)
+        self.columns = defaultdict(list)
+        for col, name in enumerate(self.symptom_names):
+            self.columns[name].append(col)
+
+        row_of = {pk: row for row, (pk, _) in enumerate(diseases)}
+        col_of = {pk: col for col, pk in enumerate(symptom_ids)}
+        links = [(row_of[d], col_of[s]) for d, s in links if d in row_of and s in col_of]
+        rows = np.array([r for r, _ in links], dtype=np.int32)
+        cols = np.array([c for _, c in links], dtype=np.int32)
+        self.matrix = sparse.csr_matrix(
+            (np.ones(len(links), dtype=np.int32), (rows, cols)),
+            shape=(len(self.disease_names), len(self.symptom_names))
+        )
+        # Duplicate links count once
+        self.matrix.data[:] = 1
+        # Column slices give the diseases of one symptom directly
+        self.by_symptom = self.matrix.tocsc()
+
+    def selection(self, symptoms):
+        import numpy as np
+
+        cols = sorted({col for name in symptoms for col in self.columns.get(name, ())})
+        x = np.zeros(len(self.symptom_names), dtype=np.int32)
+        x[cols] = 1
+        return x, cols
+
+    def rank(self, symptoms):
+        """
+        [(disease name, {matched symptom names}), ...] for every disease
+        matching at least one symptom, most matches first.
+        """
+        import numpy as np
+
+        x, cols = self.selection(symptoms)
+        counts = self.matrix @ x
+        rows = np.flatnonzero(counts)
+        rows = rows[np.argsort(-counts[rows], kind="stable")]
+
+        matched = defaultdict(set)
+        indptr, indices = self.by_symptom.indptr, self.by_symptom.indices
+        for col in cols:
+            for row in indices[indptr[col]:indptr[col + 1]]:
+                matched[row].add(self.symptom_names[col])
+        return [(self.disease_names[row], matched[row]) for row in rows]
+
+    def diseases_with(self, symptom):
+        """Names of the diseases linked to a symptom."""
+        indptr, indices = self.by_symptom.indptr, self.by_symptom.indices
+        return {self.disease_names[row] for col in self.columns.get(symptom, ())
+                for row in indices[indptr[col]:indptr[col + 1]]}
+
+    def followups(self, diseases, exclude=(), k=3):
+        """
+        Symptoms that best split `diseases` (present in about half of
+        them), skipping the ones in `exclude`.
+        """
+        import numpy as np
+
+        rows = [self.disease_names.index(name) for name in diseases]
+        present = np.asarray(self.matrix[rows].sum(axis=0)).ravel()
+        score = np.minimum(present, len(rows) - present)
+        _, skip = self.selection(exclude)
+        score[skip] = 0
+        best = [col for col in np.argsort(-score, kind="stable")[:k] if score[col] > 0]
+        return [self.symptom_names[col] for col in best]
+
+
+# ======== Autocomplete =========
+class SymptomTrie:
+    """
+    Prefix trie over the normalized symptom names and each of their words,
+    so "rash" completes "skin_rash". Every node keeps its best `limit`
+    completions precomputed: whole-name prefixes first, then the symptoms
+    linked to the most diseases, then by name.
+    """
+
+    TOP = "\0"
+
+    def __init__(self, names, disease_counts, limit=10):
+        self.names = list(names)
+        self.disease_counts = list(disease_counts)
+        self.limit = limit
+        self.root = {}
+
+        best = defaultdict(dict)  # node id -> {symptom: priority}
+        nodes = {}
+        for i, name in enumerate(self.names):
+            key = normalize(name)
+            starts = [0] + [m.end() for m in re.finditer(" ", key)]
+            for start in starts:
+                priority = 0 if start == 0 else 1
+                node = self.root
+                for ch in key[start:]:
+                    node = node.setdefault(ch, {})
+                    nodes[id(node)] = node
+                    seen = best[id(node)]
+                    seen[i] = min(seen.get(i, priority), priority)
+
+        for node_id, seen in best.items():
+            ranked = sorted(seen, key=lambda i: (seen[i], -self.disease_counts[i], self.names[i]))
+            nodes[node_id][self.TOP] = ranked[:limit]
+
+    def complete(self, prefix, k=None):
+        """Up to k (name, disease count) completions of `prefix`."""
+        node = self.root
+        for ch in normalize(prefix):
+            node = node.get(ch)
+            if node is None:
+                return []
+        if node is self.root:
+            return []
+        return [(self.names[i], self.disease_counts[i]) for i in node[self.TOP][:k or self.limit]]
+
+
+# ======== Symptom List =========
+def build_symptom_trie():
+    rows = list(Symptom.objects.annotate(n=Count("diseases")).order_by("id").values_list("name", "n"))
+    return SymptomTrie([name for name, _ in rows], [n for _, n in rows],
+                       limit=getattr(settings, "SYMPTOM_SUGGEST_LIMIT", 10))
+
+
+def symptom_list_payload():
+    """
+    SymptomListView body: symptoms of exactly one disease ("unique") and of
+    three or more ("common"), counted in one aggregate query.
+    """
+    common_symptoms = []
+    unique_symptoms = []
+
+    for name, count in Symptom.objects.annotate(n=Count("diseases")).values_list("name", "n"):
+        if count == 1:
+            unique_symptoms.append(name)
+        elif count >= 3:
+            common_symptoms.append(name)
+
+    return {
+        "common": sorted(common_symptoms),
+        "unique": sorted(unique_symptoms)
+    }
+
+
+# ======== Catalog Snapshot =========
+class Catalog:
+    """
+    One version of the symptom catalog. Derived structures are built on
+    first use and live as long as the version does.
+    """
+
+    def __init__(self, version):
+        self.version = version
+        rows = list(Symptom.objects.order_by("id").values_list("id", "name"))
+        self.symptom_ids = [pk for pk, _ in rows]
+        self.symptom_names = [name for _, name in rows]
+        self._built = {}
+        self._lock = threading.Lock()
+
+    def _build(self, name, factory):
+        if name not in self._built:
+            with self._lock:
+                if name not in self._built:
+                    self._built[name] = factory()
+        return self._built[name]
+
+    @property
+    def index(self):
+        return self._build("index", lambda: SymptomIndex(self.symptom_names))
+
+    @property
+    def trie(self):
+        return self._build("trie", build_symptom_trie)
+
+    @property
+    def list_payload(self):
+        return self._build("list_payload", symptom_list_payload)
+
+    @property
+    def incidence(self):
+        return self._build("incidence", lambda: IncidenceMatrix(self.symptom_ids, self.symptom_names))
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog():
+    """Catalog snapshot for the current version, rebuilt when it changes."""
+    global _catalog
+    version = catalog_version()
+    with _catalog_lock:
+        if _catalog is None or _catalog.version != version:
+            _catalog = Catalog(version)
+        return _catalog
+
+
+def correct_symptoms(symptoms):
+    """Best catalog name for each input symptom, dropping the ones without a close match."""
+    index = get_catalog().index
+    corrected = []
+    for s in symptoms:
+        best = index.best(s)
+        if best:
+            corrected.append(best)
+    return corrected
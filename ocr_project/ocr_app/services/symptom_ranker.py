@@ -0,0 +1,81 @@
+# services/symptom_ranker.py
+import os
+import csv
+import threading
+
+from django.conf import settings
+
+from .symptom_catalog import normalize
+
+DATASET = os.path.join(os.path.dirname(os.path.dirname(__file__)), "dataset.csv")
+
+
+class SymptomRanker:
+    """
+    Naive Bayes over the symptom columns of dataset.csv. Only the symptoms
+    a patient reports count as evidence: they rarely list every symptom
+    they have, so unmentioned ones are not taken as absent. Scoring is one
+    gather + sum over precomputed log-likelihoods, then a softmax, so a
+    request needs neither the DB nor a model library.
+    """
+
+    def __init__(self, path=DATASET, alpha=1.0):
+        import numpy as np
+
+        diseases, rows = [], []
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            next(reader)
+            for row in reader:
+                if row and row[0].strip():
+                    diseases.append(row[0].strip())
+                    rows.append({normalize(s) for s in row[1:] if s.strip()})
+
+        self.diseases = sorted(set(diseases))
+        self.symptoms = sorted(set().union(*rows))
+        self.column = {name: j for j, name in enumerate(self.symptoms)}
+        disease_row = {name: i for i, name in enumerate(self.diseases)}
+
+        # counts[d, s]: rows of disease d listing symptom s
+        counts = np.zeros((len(self.diseases), len(self.symptoms)))
+        totals = np.zeros(len(self.diseases))
+        for disease, symptoms in zip(diseases, rows):
+            i = disease_row[disease]
+            totals[i] += 1
+            counts[i, [self.column[s] for s in symptoms]] += 1
+
+        # P(symptom listed | disease), Laplace smoothed
+        p = (counts + alpha) / (totals[:, None] + 2 * alpha)
+        # log P(d | reported) = bias[d] + sum over reported s of weights[d, s] (+ const)
+        self.weights = np.log(p)
+        self.bias = np.log(totals / totals.sum())
+
+    def rank(self, symptoms, k=5):
+        """Top-k (disease, probability) for a list of symptom names, most likely first."""
+        import numpy as np
+
+        cols = sorted({self.column[key] for key in map(normalize, symptoms) if key in self.column})
+        if not cols:
+            return []
+
+        scores = self.bias + self.weights[:, cols].sum(axis=1)
+        scores -= scores.max()
+        proba = np.exp(scores)
+        proba /= proba.sum()
+
+        top = np.argsort(-proba, kind="stable")[:k]
+        return [(self.diseases[i], float(proba[i])) for i in top]
+
+
+_ranker = None
+_ranker_lock = threading.Lock()
+
+
+def get_symptom_ranker():
+    """Process-wide ranker, trained from dataset.csv on first use."""
+    global _ranker
+    if _ranker is None:
+        with _ranker_lock:
+            if _ranker is None:
+                _ranker = SymptomRanker(getattr(settings, "SYMPTOM_DATASET", DATASET))
+    return _ranker
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_save, post_delete, m2m_changed
+
+from .models import Disease, Medicine, Symptom
+from .services.symptom_catalog import bump_catalog_version
+
+# Any change to the catalog invalidates the symptom index and the medicine
+# table, see services/symptom_catalog.py and services/medicine_table.py
+for model in (Disease, Symptom, Medicine):
+    post_save.connect(bump_catalog_version, sender=model, dispatch_uid=f"catalog_save_{model.__name__}")
+    post_delete.connect(bump_catalog_version, sender=model, dispatch_uid=f"catalog_delete_{model.__name__}")
+m2m_changed.connect(bump_catalog_version, sender=Symptom.diseases.through, dispatch_uid="catalog_m2m")
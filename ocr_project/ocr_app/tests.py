@@ -1,3 +1,1160 @@
-from django.test import TestCase
+import io
+import os
+import re
+import csv
+import json
+import math
+import time
+import random
+import difflib
+import shutil
+import tempfile
+import threading
+import subprocess
+from datetime import timedelta
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from . import views
+from .models import Disease, Medicine, OcrJob, SideEffectLabel, Symptom
+from .services import (
+    disease_models, jobs, model_store, ocr, ocr_backends, ocr_cache, preprocess, symptom_catalog
+)
+from .services.inference import LinearEngine
+from .services.medicine_table import get_medicine_table
+from .services.side_effects import MAX_NAME_LENGTH, NOT_FOUND, SideEffectStore, backoff_key
+from .services.report_parser import FEATURE_SYNONYMS, REPORT_THRESHOLDS, scan_report
+from .services.symptom_catalog import get_catalog, normalize
+from .services.symptom_ranker import SymptomRanker
+from .views import clarify_disease, get_disease_from_symptoms, report_stop_condition
+
+DATASET = os.path.join(os.path.dirname(__file__), "dataset.csv")
+
+
+# ======== Report Parser =========
+# What check_report_status / match_parameters did before the alias index,
+# with aliases matched literally (re.escape)
+def escaped_threshold_value(text, aliases):
+    for label in aliases:
+        if label:
+            match = re.search(rf"{re.escape(label)}.*?(-?\d+\.\d+)", text, re.IGNORECASE | re.DOTALL)
+            if match:
+                return float(match.group(1))
+    return None
+
+
+def escaped_feature_value(text, aliases):
+    for label in aliases:
+        if label:
+            match = re.search(rf"{re.escape(label)}\s*[:\-]?\s*(\d+\.?\d*)", text, re.IGNORECASE)
+            if match:
+                return float(match.group(1))
+    return None
+
+
+def sample_reports(count, seed=0):
+    """Lab-report-like texts mixing every known alias with values, units and noise."""
+    rng = random.Random(seed)
+    aliases = sorted({a for params in REPORT_THRESHOLDS.values() for limits in params.values()
+                      for a in limits["aliases"]}
+                     | {a for synonyms in FEATURE_SYNONYMS.values() for names in synonyms.values()
+                        for a in names if a})
+    noise = ["Patient", "Report", "mg/dL", "Method", "Reference Range", "Sample: Serum", "Remarks", "-", "N/A"]
+    reports = []
+    for _ in range(count):
+        lines = []
+        for _ in range(rng.randint(3, 25)):
+            label = rng.choice(aliases)
+            label = label.upper() if rng.random() < 0.3 else label
+            value = rng.choice([
+                f"{rng.uniform(0, 500):.{rng.randint(1, 2)}f}", str(rng.randint(0, 20000)), "-" + str(rng.randint(0, 9)) + ".5",
+            ])
+            sep = rng.choice([": ", " - ", " ", ":", "\t", " = ", "\n"])
+            lines.append(f"{label}{sep}{value} {rng.choice(noise)}")
+            if rng.random() < 0.3:
+                lines.append(" ".join(rng.choice(noise) for _ in range(rng.randint(1, 5))))
+        reports.append("\n".join(lines))
+    return reports
+
+
+class ReportParserTests(SimpleTestCase):
+    def test_thresholds_match_escaped_regex(self):
+        for text in sample_reports(200):
+            scan = scan_report(text)
+            for disease, params in REPORT_THRESHOLDS.items():
+                expected = {key: escaped_threshold_value(text, limits["aliases"]) for key, limits in params.items()}
+                self.assertEqual(scan.thresholds(disease), expected, msg=f"{disease}\n{text}")
+
+    def test_features_match_escaped_regex(self):
+        for text in sample_reports(200, seed=1):
+            scan = scan_report(text)
+            for disease, synonyms in FEATURE_SYNONYMS.items():
+                expected = {col: escaped_feature_value(text, names) for col, names in synonyms.items()}
+                self.assertEqual(scan.features(disease, list(synonyms)), expected, msg=f"{disease}\n{text}")
+
+    def test_aliases_are_literal(self):
+        # "K+" used to be a regex matching any K
+        scan = scan_report("KKK 9.9\nK+ 4.2")
+        self.assertEqual(scan.thresholds("kidney")["Potassium"], 4.2)
+
+    def test_huge_text_without_digits(self):
+        start = time.perf_counter()
+        scan = scan_report("Glucose Creatinine HbA1c " * 200_000)
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertTrue(all(value is None for value in scan.thresholds("diabetes").values()))
+
+
+# ======== OCR Page Pool =========
+class FakeBackend:
+    """Reads a page's "text" back instead of running tesseract."""
+    name = "fake"
+    created = 0
+
+    def __init__(self):
+        FakeBackend.created += 1
+
+    def image_to_text(self, image):
+        return image["text"]
+
+
+def fake_pages(*texts):
+    return [{"text": text} for text in texts]
+
+
+@override_settings(OCR_BACKEND=FakeBackend.name)
+class OcrPagePoolTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(ocr_backends.BACKENDS, {FakeBackend.name: FakeBackend})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(ocr.shutdown_ocr_pool)
+
+    def test_sequential_pages_in_order(self):
+        texts, page_stats = ocr.ocr_images(fake_pages("one", "two", "three"), [4, 5, 6])
+        self.assertEqual(texts, ["one", "two", "three"])
+        self.assertEqual([p["page"] for p in page_stats], [4, 5, 6])
+        self.assertEqual([p["chars"] for p in page_stats], [3, 3, 5])
+        self.assertTrue(all(p["source"] == "ocr" for p in page_stats))
+
+    @override_settings(OCR_WORKERS=3)
+    def test_pool_keeps_page_order(self):
+        pages = fake_pages(*(f"page {i}" for i in range(1, 11)))
+        with ThreadPoolExecutor(max_workers=3) as pool, \
+                mock.patch.object(ocr, "get_ocr_pool", return_value=pool):
+            texts, page_stats = ocr.ocr_images(pages)
+        self.assertEqual(texts, [f"page {i}" for i in range(1, 11)])
+        self.assertEqual([p["page"] for p in page_stats], list(range(1, 11)))
+
+    @override_settings(OCR_WORKERS=2)
+    def test_broken_pool_falls_back_to_sequential(self):
+        broken = mock.Mock()
+        broken.map.side_effect = BrokenProcessPool()
+        with mock.patch.object(ocr, "get_ocr_pool", return_value=broken), \
+                mock.patch.object(ocr, "shutdown_ocr_pool") as shutdown:
+            texts, _ = ocr.ocr_images(fake_pages("a", "b"))
+        self.assertEqual(texts, ["a", "b"])
+        shutdown.assert_called_once()
+
+    def test_pool_resized_with_setting(self):
+        with override_settings(OCR_WORKERS=2):
+            pool = ocr.get_ocr_pool()
+            self.assertIs(ocr.get_ocr_pool(), pool)
+        with override_settings(OCR_WORKERS=3):
+            self.assertIsNot(ocr.get_ocr_pool(), pool)
+
+
+# ======== Streaming PDF Rasterization =========
+class FakePdf:
+    """Stands in for pdf2image: renders pages as dicts and tracks how many are alive."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.calls = []
+        self.alive = self.peak = 0
+
+    def convert_from_path(self, path, dpi, first_page, last_page):
+        self.calls.append((first_page, last_page))
+        images = [RenderedPage(self, self.pages[page - 1]) for page in range(first_page, last_page + 1)]
+        self.alive += len(images)
+        self.peak = max(self.peak, self.alive)
+        return images
+
+
+class RenderedPage(dict):
+    def __init__(self, pdf, text):
+        super().__init__(text=text)
+        self.pdf = pdf
+
+    def close(self):
+        self.pdf.alive -= 1
+
+
+def fake_pdf_upload():
+    return SimpleUploadedFile("report.pdf", b"%PDF-1.4 not really")
+
+
+@override_settings(OCR_BACKEND=FakeBackend.name, OCR_WORKERS=1)
+class StreamingPdfTests(SimpleTestCase):
+    def setUp(self):
+        self.pdf = FakePdf([f"page {i}" for i in range(1, 8)])
+        for patcher in (
+            mock.patch.dict(ocr_backends.BACKENDS, {FakeBackend.name: FakeBackend}),
+            mock.patch("pdf2image.convert_from_path", self.pdf.convert_from_path),
+            mock.patch.object(ocr, "count_pdf_pages", return_value=len(self.pdf.pages)),
+            mock.patch.object(ocr, "extract_text_layer", return_value=None),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_windows_render_consecutive_runs(self):
+        windows = list(ocr.iter_pdf_windows("report.pdf", [1, 2, 3, 5, 6, 7], window=4))
+        self.assertEqual([pages for pages, _ in windows], [[1, 2, 3, 5], [6, 7]])
+        self.assertEqual(self.pdf.calls, [(1, 3), (5, 5), (6, 7)])
+        self.assertEqual([page["text"] for page in windows[0][1]], ["page 1", "page 2", "page 3", "page 5"])
+
+    @override_settings(OCR_STREAM_WINDOW=2)
+    def test_streaming_holds_one_window(self):
+        texts, page_stats, total = ocr.ocr_pdf_streaming(fake_pdf_upload())
+        self.assertEqual(texts, [f"page {i}" for i in range(1, 8)])
+        self.assertEqual([p["page"] for p in page_stats], list(range(1, 8)))
+        self.assertEqual(total, 7)
+        self.assertEqual(self.pdf.peak, 2)
+        self.assertEqual(self.pdf.alive, 0)
+
+    def test_spooled_upload_is_removed(self):
+        with ocr.spool_upload(fake_pdf_upload()) as path:
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(), b"%PDF-1.4 not really")
+        self.assertFalse(os.path.exists(path))
+
+
+# ======== OCR Cache =========
+def ocr_result(text):
+    return {**ocr.text_result(text), "pages": [{"page": 1, "source": "ocr", "seconds": 0.1, "chars": len(text)}]}
+
+
+class OcrCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        settings_override = override_settings(OCR_CACHE_DIR=cache_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        ocr_cache.clear()
+        self.addCleanup(ocr_cache.clear)
+
+    def counts(self):
+        stats = ocr_cache.cache_stats()
+        return {name: stats[name] for name in ("memory_hits", "disk_hits", "misses", "memory_evictions")}
+
+    def assertCounted(self, before, **expected):
+        after = self.counts()
+        self.assertEqual({name: after[name] - before[name] for name in expected}, expected)
+
+    def test_miss_then_memory_then_disk_hit(self):
+        key = ocr_cache.key_for_upload(fake_pdf_upload())
+        before = self.counts()
+        self.assertIsNone(ocr_cache.lookup(key))
+        ocr_cache.store(key, ocr_result("Glucose 140.0"))
+        self.assertEqual(ocr_cache.lookup(key)["text"], "Glucose 140.0")
+        ocr_cache._memory.clear()
+        self.assertEqual(ocr_cache.lookup(key)["text"], "Glucose 140.0")
+        self.assertCounted(before, misses=1, memory_hits=1, disk_hits=1)
+
+    def test_key_covers_bytes_and_config(self):
+        key = ocr_cache.key_for_upload(fake_pdf_upload())
+        self.assertEqual(ocr_cache.key_for_upload(fake_pdf_upload()), key)
+        self.assertNotEqual(ocr_cache.key_for_upload(SimpleUploadedFile("report.pdf", b"%PDF-1.4 other")), key)
+        with override_settings(OCR_PDF_DPI=300):
+            self.assertNotEqual(ocr_cache.key_for_upload(fake_pdf_upload()), key)
+
+    @override_settings(OCR_CACHE_MEMORY_BYTES=20)
+    def test_memory_tier_evicts_least_recently_used(self):
+        before = self.counts()
+        for key in ("a", "b"):
+            ocr_cache.store(key, ocr_result(f"{key} is ten"))
+        ocr_cache.lookup("a")
+        ocr_cache.store("c", ocr_result("c is ten"))
+        self.assertEqual(list(ocr_cache._memory), ["a", "c"])
+        self.assertCounted(before, memory_evictions=1)
+
+    def test_run_ocr_serves_repeat_uploads(self):
+        with mock.patch.object(ocr, "_ocr_upload", return_value=ocr_result("Glucose 140.0")) as upload:
+            first = ocr.run_ocr(fake_pdf_upload())
+            second = ocr.run_ocr(fake_pdf_upload())
+        upload.assert_called_once()
+        self.assertFalse(first["cached"])
+        self.assertTrue(second["cached"])
+        self.assertEqual(second["text"], "Glucose 140.0")
+
+    def test_early_stopped_text_is_not_cached(self):
+        partial = {**ocr_result("Glucose 140.0"), "stopped_early": True}
+        with mock.patch.object(ocr, "_ocr_upload", return_value=partial) as upload:
+            ocr.run_ocr(fake_pdf_upload())
+            ocr.run_ocr(fake_pdf_upload())
+        self.assertEqual(upload.call_count, 2)
+
+
+# ======== PDF Text Layer =========
+LAYER_PAGE = "Patient report. Glucose: 182.0 mg/dL HbA1c: 8.1 % Fasting Blood Sugar: 140.0 mg/dL"
+
+
+def pdftotext_output(*pages):
+    return subprocess.CompletedProcess([], 0, stdout="".join(f"{page}\f" for page in pages).encode("utf-8"))
+
+
+@override_settings(OCR_BACKEND=FakeBackend.name, OCR_WORKERS=1)
+class TextLayerTests(SimpleTestCase):
+    def setUp(self):
+        self.pdf = FakePdf(["scanned 1", "scanned 2", "scanned 3"])
+        for patcher in (
+            mock.patch.dict(ocr_backends.BACKENDS, {FakeBackend.name: FakeBackend}),
+            mock.patch("pdf2image.convert_from_path", self.pdf.convert_from_path),
+            mock.patch.object(ocr, "count_pdf_pages", return_value=len(self.pdf.pages)),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_only_pages_without_text_are_ocrd(self):
+        with mock.patch("subprocess.run", return_value=pdftotext_output(LAYER_PAGE, "  ", LAYER_PAGE)):
+            texts, page_stats, total = ocr.ocr_pdf_streaming(fake_pdf_upload())
+        self.assertEqual(texts, [LAYER_PAGE, "scanned 2", LAYER_PAGE])
+        self.assertEqual([p["source"] for p in page_stats], ["text_layer", "ocr", "text_layer"])
+        self.assertEqual(self.pdf.calls, [(2, 2)])
+
+    def test_layer_is_padded_to_page_count(self):
+        with mock.patch("subprocess.run", return_value=pdftotext_output(LAYER_PAGE)):
+            self.assertEqual(ocr.extract_text_layer("report.pdf", 3), [LAYER_PAGE, "", ""])
+
+    def test_missing_pdftotext_ocrs_every_page(self):
+        with mock.patch("subprocess.run", side_effect=FileNotFoundError("pdftotext")):
+            texts, _, _ = ocr.ocr_pdf_streaming(fake_pdf_upload())
+        self.assertEqual(texts, ["scanned 1", "scanned 2", "scanned 3"])
+        self.assertEqual(self.pdf.calls, [(1, 2), (3, 3)])
+
+    @override_settings(OCR_USE_TEXT_LAYER=False)
+    def test_text_layer_can_be_disabled(self):
+        with mock.patch("subprocess.run") as run:
+            self.assertIsNone(ocr.extract_text_layer("report.pdf", 3))
+        run.assert_not_called()
+
+
+# ======== Image Pre-processing =========
+def photo_upload(size=(4000, 3000), angle=0.0, fmt="JPEG"):
+    """A page photo with dark text-like rows, optionally rotated."""
+    from PIL import Image, ImageDraw
+
+    img = Image.new("RGB", size, (235, 230, 220))
+    draw = ImageDraw.Draw(img)
+    for y in range(size[1] // 10, size[1] * 9 // 10, size[1] // 25):
+        draw.rectangle([size[0] // 10, y, size[0] * 8 // 10, y + size[1] // 100], fill=(20, 20, 30))
+    if angle:
+        img = img.rotate(angle, expand=True, fillcolor=(235, 230, 220))
+
+    buffer = io.BytesIO()
+    img.save(buffer, fmt)
+    buffer.seek(0)
+    buffer.name = f"photo.{fmt.lower()}"
+    return buffer
+
+
+class PreprocessTests(SimpleTestCase):
+    def test_default_pipeline_downsizes_to_gray(self):
+        img, timings = preprocess.open_image(photo_upload())
+        self.assertEqual(img.mode, "L")
+        self.assertLessEqual(max(img.size), preprocess.get_target_long_side())
+        self.assertGreater(max(img.size), preprocess.get_target_long_side() // 2)
+        self.assertEqual(list(timings), preprocess.DEFAULT_PIPELINE)
+
+    @override_settings(OCR_PREPROCESS=["downscale", "grayscale"])
+    def test_small_images_are_not_upscaled(self):
+        img, _ = preprocess.open_image(photo_upload(size=(800, 600), fmt="PNG"))
+        self.assertEqual(img.size, (800, 600))
+
+    @override_settings(OCR_PREPROCESS=["grayscale", "binarize"])
+    def test_binarize_leaves_black_and_white(self):
+        img, _ = preprocess.open_image(photo_upload(size=(800, 600), fmt="PNG"))
+        self.assertEqual({value for _, value in img.getcolors()}, {0, 255})
+
+    def test_deskew_finds_rotation(self):
+        from PIL import Image
+
+        for angle in (-3.0, 2.0):
+            img = Image.open(photo_upload(size=(1200, 900), angle=angle, fmt="PNG"))
+            self.assertAlmostEqual(preprocess.estimate_skew(img), -angle, delta=0.5)
+
+    @override_settings(OCR_PREPROCESS=["grayscale", "sharpen"])
+    def test_unknown_stage(self):
+        with self.assertRaises(ValueError):
+            preprocess.get_pipeline()
+
+# ======== OCR Backends =========
+class BrokenBackend:
+    name = "broken"
+
+    def __init__(self):
+        raise ImportError("No module named 'tesserocr'")
+
+
+class OcrBackendTests(SimpleTestCase):
+    def setUp(self):
+        for patcher in (
+            mock.patch.dict(ocr_backends.BACKENDS, {FakeBackend.name: FakeBackend, BrokenBackend.name: BrokenBackend}),
+            mock.patch.object(ocr_backends, "_local", threading.local()),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_auto_prefers_tesserocr(self):
+        with mock.patch.object(ocr_backends, "tesserocr_available", return_value=True):
+            self.assertEqual(ocr_backends.resolve_backend_name("auto"), "tesserocr")
+        with mock.patch.object(ocr_backends, "tesserocr_available", return_value=False):
+            self.assertEqual(ocr_backends.resolve_backend_name("auto"), "pytesseract")
+        self.assertEqual(ocr_backends.resolve_backend_name("pytesseract"), "pytesseract")
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            ocr_backends.resolve_backend_name("easyocr")
+
+    def test_one_engine_per_thread(self):
+        created = FakeBackend.created
+        engine = ocr_backends.get_backend(FakeBackend.name)
+        self.assertIs(ocr_backends.get_backend(FakeBackend.name), engine)
+
+        other = []
+        thread = threading.Thread(target=lambda: other.append(ocr_backends.get_backend(FakeBackend.name)))
+        thread.start()
+        thread.join()
+        self.assertIsNot(other[0], engine)
+        self.assertEqual(FakeBackend.created - created, 2)
+
+    def test_unavailable_backend_falls_back_to_pytesseract(self):
+        with mock.patch.object(ocr_backends, "PytesseractBackend", FakeBackend):
+            self.assertIsInstance(ocr_backends.get_backend(BrokenBackend.name), FakeBackend)
+
+
+# ======== Early Stop =========
+@override_settings(OCR_BACKEND=FakeBackend.name, OCR_WORKERS=1, OCR_STREAM_WINDOW=1, OCR_EARLY_STOP=True)
+class EarlyStopTests(SimpleTestCase):
+    def setUp(self):
+        for patcher in (
+            mock.patch.dict(ocr_backends.BACKENDS, {FakeBackend.name: FakeBackend}),
+            mock.patch.object(ocr, "extract_text_layer", return_value=None),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def ocr_pages(self, *pages):
+        pdf = FakePdf(pages)
+        with mock.patch("pdf2image.convert_from_path", pdf.convert_from_path), \
+                mock.patch.object(ocr, "count_pdf_pages", return_value=len(pages)):
+            texts, _, _ = ocr.ocr_pdf_streaming(fake_pdf_upload(), stop_when=report_stop_condition("diabetes"))
+        return texts
+
+    def test_stops_once_every_parameter_is_settled(self):
+        texts = self.ocr_pages("FBS: 120.0\nHbA1c: 8.1 %\nGlucose: 182.0", "Lipid profile", "Remarks")
+        self.assertEqual(len(texts), 1)
+
+    def test_keeps_going_for_a_better_alias(self):
+        # Glucose resolves through "Blood Sugar" on page 1, but page 2 has "Glucose" itself
+        pages = ("FBS: 120.0\nHbA1c: 8.1 %\nFasting Blood Sugar 140.0", "Glucose 182.0", "Remarks")
+        texts = self.ocr_pages(*pages)
+        self.assertEqual(len(texts), 2)
+        self.assertEqual(scan_report("\n".join(texts)).thresholds("diabetes"),
+                         scan_report("\n".join(pages)).thresholds("diabetes"))
+        self.assertEqual(scan_report("\n".join(texts)).thresholds("diabetes")["Glucose"], 182.0)
+
+
+# ======== Model Artifacts =========
+class ModelArtifactTests(SimpleTestCase):
+    def setUp(self):
+        artifacts = tempfile.TemporaryDirectory()
+        self.addCleanup(artifacts.cleanup)
+        settings_override = override_settings(MODEL_ARTIFACT_DIR=artifacts.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.trained = disease_models.train_model(disease_models.MODEL_SPECS["diabetes"])
+
+    def save(self, version=None):
+        path = disease_models.save_artifact("diabetes", *self.trained, version=version)
+        return os.path.basename(path)[:-5]
+
+    def test_versions_in_training_order(self):
+        saved = [self.save("v9"), self.save("v10"), self.save(), self.save("v1")]
+        self.assertEqual(disease_models.list_versions("diabetes"), saved)
+        self.assertEqual(disease_models.read_artifact("diabetes")["version"], "v1")
+
+    def test_same_second_versions_are_kept(self):
+        with mock.patch.object(disease_models, "datetime", wraps=disease_models.datetime) as clock:
+            clock.now.side_effect = lambda tz: disease_models.datetime(2026, 1, 1, tzinfo=tz)
+            clock.fromisoformat.side_effect = disease_models.datetime.fromisoformat
+            first, second = self.save(), self.save()
+        self.assertEqual((first, second), ("20260101T000000Z", "20260101T000000Z-2"))
+        self.assertEqual(set(disease_models.list_versions("diabetes")), {first, second})
+        self.assertEqual(disease_models.read_artifact("diabetes", first)["weights"], f"{first}.npy")
+
+    def test_taken_tag_is_refused(self):
+        self.save("v1")
+        with self.assertRaises(FileExistsError):
+            self.save("v1")
+        self.assertEqual(disease_models.list_versions("diabetes"), ["v1"])
+
+
+# ======== Linear Inference =========
+class LinearEngineTests(SimpleTestCase):
+    def setUp(self):
+        import numpy as np
+        from sklearn.linear_model import LogisticRegression
+
+        rng = np.random.default_rng(0)
+        self.entries, self.samples = {}, {}
+        for disease, n_columns, classes in (("a", 3, [0, 1]), ("b", 5, [1, 2]), ("multi", 2, [0, 1, 2])):
+            X = rng.normal(size=(200, n_columns)) * rng.uniform(0.5, 50, size=n_columns)
+            y = np.array(classes)[rng.integers(0, len(classes), size=200)]
+            columns = [f"{disease}{i}" for i in range(n_columns)]
+            self.entries[disease] = (LogisticRegression(max_iter=1000).fit(X, y), columns)
+            self.samples[disease] = rng.normal(size=(50, n_columns)) * X.std(axis=0)
+        self.engine = LinearEngine(self.entries)
+
+    def test_score_matches_sklearn(self):
+        import numpy as np
+
+        self.assertEqual(self.engine.diseases, ["a", "b"])
+        for disease in self.engine.diseases:
+            model, _ = self.entries[disease]
+            X = self.samples[disease]
+            labels, proba = self.engine.score(disease, X)
+            np.testing.assert_array_equal(labels, model.predict(X))
+            np.testing.assert_allclose(proba, model.predict_proba(X)[:, 1], rtol=1e-12)
+
+    def test_score_all_matches_sklearn(self):
+        import numpy as np
+
+        rows = [
+            {disease: dict(zip(self.entries[disease][1], self.samples[disease][i])) for disease in ("a", "b")}
+            for i in range(50)
+        ]
+        labels, proba = self.engine.score_all([self.engine.pack(row) for row in rows])
+        for j, disease in enumerate(self.engine.diseases):
+            model, _ = self.entries[disease]
+            np.testing.assert_array_equal(labels[:, j], model.predict(self.samples[disease]))
+            np.testing.assert_allclose(proba[:, j], model.predict_proba(self.samples[disease])[:, 1], rtol=1e-12)
+
+    def test_predict_one_fills_missing_with_zero(self):
+        model, columns = self.entries["b"]
+        label, proba = self.engine.predict_one("b", {columns[0]: 3.5, columns[2]: None})
+        x = [[3.5, 0, 0, 0, 0]]
+        self.assertEqual(label, model.predict(x)[0])
+        self.assertAlmostEqual(proba, model.predict_proba(x)[0, 1], places=12)
+
+
+# ======== Model Releases =========
+class ModelReleaseTests(SimpleTestCase):
+    def setUp(self):
+        artifacts = tempfile.TemporaryDirectory()
+        self.addCleanup(artifacts.cleanup)
+        settings_override = override_settings(MODEL_ARTIFACT_DIR=artifacts.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def served_version(self):
+        return model_store.ModelStore().refresh(force=True).version
+
+    def test_publish_and_roll_back_to_builtin(self):
+        self.assertEqual(self.served_version(), model_store.BUILTIN_VERSION)
+        model_store.publish_release(note="first")
+        model_store.publish_release(note="second")
+        self.assertEqual(self.served_version(), "2")
+
+        self.assertEqual(model_store.rollback_release()["version"], "1")
+        self.assertEqual(self.served_version(), "1")
+        self.assertEqual(model_store.rollback_release()["version"], model_store.BUILTIN_VERSION)
+        self.assertEqual(self.served_version(), model_store.BUILTIN_VERSION)
+        with self.assertRaises(ValueError):
+            model_store.rollback_release()
+
+        # Publishing from builtin starts from the built-in thresholds
+        release = model_store.publish_release()
+        self.assertEqual(release["version"], "3")
+        self.assertEqual(model_store.read_release(3)["thresholds"], json.loads(json.dumps(REPORT_THRESHOLDS)))
+
+    def test_roll_back_to_a_named_release(self):
+        thresholds = {"diabetes": {"HbA1c": {"aliases": ["HbA1c"], "min": 0, "max": 6.4}}}
+        model_store.publish_release(thresholds=thresholds)
+        model_store.publish_release()
+        self.assertEqual(model_store.read_release(2)["thresholds"], thresholds)
+
+        model_store.rollback_release(to="builtin")
+        self.assertEqual(self.served_version(), model_store.BUILTIN_VERSION)
+        model_store.rollback_release(to=2)
+        self.assertEqual(model_store.ModelStore().refresh(force=True).thresholds, thresholds)
+        with self.assertRaises(ValueError):
+            model_store.rollback_release(to=7)
+
+    def test_publish_pins_existing_artifacts_only(self):
+        trained = disease_models.train_model(disease_models.MODEL_SPECS["diabetes"])
+        disease_models.save_artifact("diabetes", *trained, version="v1")
+        self.assertEqual(model_store.publish_release()["models"], {"diabetes": "v1"})
+        with self.assertRaises(ValueError):
+            model_store.publish_release({"diabetes": "v2"})
+
+
+# ======== Model Registry =========
+class ModelRegistryTests(SimpleTestCase):
+    def test_every_model_is_reachable(self):
+        # A model without a threshold table can never be served (views.report_supported)
+        self.assertEqual(set(disease_models.MODEL_SPECS) - set(REPORT_THRESHOLDS), set())
+        self.assertNotIn("breast", disease_models.MODEL_SPECS)
+        self.assertNotIn("covid", disease_models.MODEL_SPECS)
+
+    def test_models_load_lazily(self):
+        models = disease_models.DiseaseModels(disease_models.MODEL_SPECS)
+        self.assertIn("thyroid", models)
+        self.assertFalse(any(models.is_loaded(disease) for disease in models))
+
+
+# ======== Symptom Ranker =========
+RANKER_ROWS = [
+    ("Flu", ["fever", "cough", "headache"]),
+    ("Flu", ["fever", "cough"]),
+    ("Flu", ["fever", "chills"]),
+    ("Allergy", ["skin_rash", " itching", "sneezing"]),
+    ("Allergy", ["sneezing", "cough"]),
+    ("Migraine", ["headache", "nausea"]),
+]
+
+
+def naive_bayes(rows, reported, alpha=1.0):
+    """P(disease | reported symptoms), computed the long way."""
+    diseases = sorted({d for d, _ in rows})
+    scores = {}
+    for disease in diseases:
+        listed = [{normalize(s) for s in symptoms} for d, symptoms in rows if d == disease]
+        log_p = math.log(len(listed) / len(rows))
+        for symptom in reported:
+            log_p += math.log((sum(symptom in s for s in listed) + alpha) / (len(listed) + 2 * alpha))
+        scores[disease] = log_p
+    total = sum(math.exp(v) for v in scores.values())
+    return {disease: math.exp(v) / total for disease, v in scores.items()}
+
+
+class SymptomRankerTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, "dataset.csv")
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["Disease", "Symptom_1", "Symptom_2", "Symptom_3"])
+            for disease, symptoms in RANKER_ROWS:
+                writer.writerow([disease] + symptoms + [""] * (3 - len(symptoms)))
+        self.ranker = SymptomRanker(path)
+
+    def test_matches_naive_bayes(self):
+        for reported in (["fever"], ["cough"], ["headache", "nausea"], ["sneezing", "cough", "fever"]):
+            expected = naive_bayes(RANKER_ROWS, reported)
+            ranked = self.ranker.rank(reported, k=3)
+            self.assertEqual([d for d, _ in ranked], sorted(expected, key=lambda d: -expected[d]), msg=reported)
+            for disease, probability in ranked:
+                self.assertAlmostEqual(probability, expected[disease], places=12)
+
+    def test_names_are_normalized_and_unknown_ignored(self):
+        self.assertEqual(self.ranker.rank(["Skin_Rash ", "teleportation"]), self.ranker.rank(["skin rash"]))
+        self.assertEqual(self.ranker.rank(["teleportation"]), [])
+        self.assertEqual(len(self.ranker.rank(["fever"], k=2)), 2)
+
+    def test_dataset_rows_rank_their_disease_first(self):
+        ranker = SymptomRanker()
+        hits = total = 0
+        with open(DATASET, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                disease = row.pop("Disease").strip()
+                hits += ranker.rank([s for s in row.values() if s and s.strip()], k=1)[0][0] == disease
+                total += 1
+        self.assertGreater(hits / total, 0.9)
+
+
+# ======== OCR Jobs =========
+REPORT = b"Glucose: 182.0 mg/dL\nHbA1c: 8.1 %\nFasting Blood Sugar: 140.0\nAge: 54\nBMI: 31.2\n"
+
+
+class OcrJobTests(TransactionTestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        artifacts = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.addCleanup(artifacts.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media.name, MODEL_ARTIFACT_DIR=artifacts.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_txt_job_round_trip(self):
+        response = self.client.post("/api/report/ocr/jobs/", {
+            "health_file": SimpleUploadedFile("report.txt", REPORT, content_type="text/plain"),
+            "target_disease": "diabetes",
+        })
+        self.assertEqual(response.status_code, 202)
+        status_url = response.json()["status_url"]
+
+        deadline = time.monotonic() + 60
+        while True:
+            job = self.client.get(status_url).json()
+            if job["status"] in ("done", "failed") or time.monotonic() > deadline:
+                break
+            time.sleep(0.1)
+        self.assertEqual(job["status"], "done", msg=job)
+
+        direct = self.client.post("/api/report/ocr/", {
+            "health_file": SimpleUploadedFile("report.txt", REPORT, content_type="text/plain"),
+            "target_disease": "diabetes",
+        }).json()
+        for key in ("threshold_status", "matched_parameters", "severity", "final_decision", "medicines"):
+            self.assertEqual(job["result"][key], direct[key], msg=key)
+        self.assertEqual(job["result"]["matched_parameters"]["HbA1c"], 8.1)
+
+    def test_unknown_job(self):
+        response = self.client.get("/api/report/ocr/jobs/00000000-0000-0000-0000-000000000000/")
+        self.assertEqual(response.status_code, 404)
+
+    def old_job(self, status):
+        job = OcrJob.objects.create(file=ContentFile(REPORT, name="report.txt"), target_disease="diabetes")
+        long_ago = timezone.now() - timedelta(hours=1)
+        OcrJob.objects.filter(pk=job.pk).update(status=status, created_at=long_ago, updated_at=long_ago)
+        return OcrJob.objects.get(pk=job.pk)
+
+    @override_settings(OCR_JOB_STALE_SECONDS=60)
+    def test_only_running_jobs_go_stale(self):
+        self.assertEqual(jobs.expire_stale_job(self.old_job("queued")).status, "queued")
+        self.assertEqual(jobs.expire_stale_job(self.old_job("running")).status, "failed")
+
+    @override_settings(OCR_JOB_STALE_SECONDS=60)
+    def test_expired_job_is_not_run(self):
+        job = jobs.expire_stale_job(self.old_job("running"))
+        jobs.run_ocr_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+        self.assertIsNone(job.result)
+
+
+# ======== Requested Disease Only =========
+class RequestedDiseaseTests(TestCase):
+    def setUp(self):
+        artifacts = tempfile.TemporaryDirectory()
+        self.addCleanup(artifacts.cleanup)
+        settings_override = override_settings(MODEL_ARTIFACT_DIR=artifacts.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def scored_diseases(self, call, *args):
+        with mock.patch.object(views, "match_parameters", wraps=views.match_parameters) as match, \
+                mock.patch.object(views, "check_report_status", wraps=views.check_report_status) as check:
+            result = call(*args)
+        self.assertEqual({c.args[2] for c in match.call_args_list}, {c.args[1] for c in check.call_args_list})
+        return result, {c.args[2] for c in match.call_args_list}
+
+    def test_ocr_scores_only_the_target(self):
+        response, scored = self.scored_diseases(self.client.post, "/api/report/ocr/", {
+            "health_file": SimpleUploadedFile("report.txt", REPORT, content_type="text/plain"),
+            "target_disease": "diabetes",
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(scored, {"diabetes"})
+        self.assertEqual(response.json()["matched_parameters"]["HbA1c"], 8.1)
+
+    def test_pdf_scores_only_the_target(self):
+        response, scored = self.scored_diseases(self.client.post, "/api/report/pdf/", {
+            "disease": "diabetes", "ocr_text": REPORT.decode("utf-8"),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(scored, {"diabetes"})
+
+    def test_predict_disease_subset_matches_all(self):
+        text = REPORT.decode("utf-8")
+        every = views.predict_disease(text)
+        subset, scored = self.scored_diseases(views.predict_disease, text, ["heart", "diabetes", "unknown"])
+        self.assertEqual(scored, {"heart", "diabetes"})
+        self.assertEqual(subset, {disease: every[disease] for disease in ("heart", "diabetes")})
+
+
+# ======== Batch Scoring =========
+class BatchTests(TestCase):
+    def setUp(self):
+        artifacts = tempfile.TemporaryDirectory()
+        self.addCleanup(artifacts.cleanup)
+        settings_override = override_settings(MODEL_ARTIFACT_DIR=artifacts.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def post_json(self, body):
+        return self.client.post("/api/report/batch/", json.dumps(body), content_type="application/json")
+
+    def test_lines_match_single_reports(self):
+        texts = [REPORT.decode("utf-8"), "HbA1c: 5.1 %", {"name": "liver", "text": "Total Bilirubin 2.5",
+                                                           "target_disease": "liver"}]
+        response = self.post_json({"target_disease": "diabetes", "texts": texts})
+        self.assertEqual(response.status_code, 200)
+        lines = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual([line["index"] for line in lines], [0, 1, 2])
+        self.assertEqual([line["name"] for line in lines], ["text-0", "text-1", "liver"])
+
+        for line, (text, disease) in zip(lines, [(texts[0], "diabetes"), (texts[1], "diabetes"),
+                                                 (texts[2]["text"], "liver")]):
+            direct = self.client.post("/api/report/ocr/", {
+                "health_file": SimpleUploadedFile("report.txt", text.encode("utf-8"), content_type="text/plain"),
+                "target_disease": disease,
+            })
+            self.assertEqual(line["status"], direct.status_code)
+            for key in ("threshold_status", "matched_parameters", "severity", "final_decision"):
+                self.assertEqual(line["result"][key], direct.json()[key], msg=key)
+
+    def test_texts_must_be_a_list(self):
+        response = self.post_json({"target_disease": "diabetes", "texts": "abc"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["error"], "texts must be a list")
+
+    def test_texts_must_be_strings(self):
+        for texts in ([1], ["Glucose 140.0", None], [{"text": 5}], [["HbA1c 8.1"]]):
+            response = self.post_json({"target_disease": "diabetes", "texts": texts})
+            self.assertEqual(response.status_code, 400, msg=texts)
+
+    def test_body_must_be_an_object(self):
+        self.assertEqual(self.post_json(["Glucose 140.0"]).status_code, 400)
+        response = self.client.post("/api/report/batch/", "{", content_type="application/json")
+        self.assertEqual(response.json()["error"], "Invalid JSON body")
+
+
+# ======== Symptom Catalog =========
+def load_catalog():
+    """Diseases, symptoms and their links from dataset.csv, as `manage.py i_symp` imports them."""
+    links = {}
+    with open(DATASET, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            disease = row.pop("Disease").strip()
+            for name in row.values():
+                if name and name.strip():
+                    links.setdefault(name.strip(), set()).add(disease)
+
+    diseases = {name: Disease.objects.create(name=name) for name in sorted(set().union(*links.values()))}
+    for name in sorted(links):
+        Symptom.objects.create(name=name).diseases.set([diseases[d] for d in sorted(links[name])])
+
+
+@override_settings(SYMPTOM_CATALOG_POLL_SECONDS=0)
+class SymptomCatalogTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        load_catalog()
+
+    def setUp(self):
+        self.names = list(Symptom.objects.order_by("id").values_list("name", flat=True))
+
+    def typos(self, count, seed=0):
+        rng = random.Random(seed)
+        samples = []
+        for _ in range(count):
+            name = list(rng.choice(self.names))
+            for _ in range(rng.randint(0, 2)):
+                i = rng.randrange(len(name))
+                op = rng.choice(["drop", "swap", "replace"])
+                if op == "drop" and len(name) > 3:
+                    del name[i]
+                elif op == "swap" and i + 1 < len(name):
+                    name[i], name[i + 1] = name[i + 1], name[i]
+                else:
+                    name[i] = rng.choice("abcdefghijklmnopqrstuvwxyz_")
+            samples.append("".join(name))
+        return samples + ["fever", "headach", "skin rash", "xyz", "vomitting", "chest pain"]
+
+    def test_correction_matches_difflib(self):
+        for text in self.typos(150):
+            expected = difflib.get_close_matches(normalize(text), [normalize(n) for n in self.names], n=1)
+            corrected = get_disease_from_symptoms([text])
+            self.assertEqual([normalize(c) for c in corrected], expected, msg=text)
+
+    def test_clarify_ranking_matches_overlap_count(self):
+        rng = random.Random(2)
+        for _ in range(200):
+            symptoms = rng.sample(self.names, rng.randint(1, 5))
+            ranked, _ = clarify_disease(symptoms)
+
+            expected = {}
+            for symptom in Symptom.objects.filter(name__in=symptoms).prefetch_related("diseases"):
+                for disease in symptom.diseases.all():
+                    expected.setdefault(disease.name, set()).add(symptom.name)
+
+            self.assertEqual(dict(ranked), expected)
+            counts = [len(matched) for _, matched in ranked]
+            self.assertEqual(counts, sorted(counts, reverse=True))
+
+    def test_followups_are_new_symptoms_of_tied_diseases(self):
+        ranked, options = clarify_disease(["cough"])
+        self.assertTrue(options)
+        tied = [name for name, matched in ranked if len(matched) == len(ranked[0][1])]
+        tied_symptoms = set(Symptom.objects.filter(diseases__name__in=tied).values_list("name", flat=True))
+        self.assertLessEqual(len(options), 3)
+        self.assertNotIn("cough", options)
+        self.assertTrue(set(options) <= tied_symptoms)
+
+    def test_symptom_list_etag(self):
+        first = self.client.get("/api/symptoms/list/")
+        self.assertEqual(first.status_code, 200)
+        etag = first["ETag"]
+
+        self.assertEqual(self.client.get("/api/symptoms/list/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Symptom.objects.create(name="brand_new_symptom").diseases.add(Disease.objects.first())
+        changed = self.client.get("/api/symptoms/list/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], etag)
+        self.assertIn("brand_new_symptom", changed.json()["unique"])
+
+    def test_bulk_changes_bump_the_version_once(self):
+        version = symptom_catalog.catalog_version()
+        with mock.patch.object(symptom_catalog, "_bump", wraps=symptom_catalog._bump) as bump:
+            with symptom_catalog.deferred_catalog_bumps():
+                disease = Disease.objects.create(name="Brand New Disease")
+                for i in range(20):
+                    Symptom.objects.create(name=f"brand_new_symptom_{i}").diseases.add(disease)
+                with symptom_catalog.deferred_catalog_bumps():
+                    Symptom.objects.filter(name="brand_new_symptom_0").delete()
+                bump.assert_not_called()
+            bump.assert_called_once()
+            self.assertNotEqual(symptom_catalog.catalog_version(), version)
+
+            with symptom_catalog.deferred_catalog_bumps():
+                pass
+            bump.assert_called_once()
+
+    def test_trie_matches_brute_force(self):
+        counts = {s.name: s.diseases.count() for s in Symptom.objects.prefetch_related("diseases")}
+        trie = get_catalog().trie
+        for prefix in ["s", "sk", "skin", "rash", "pain", "high f", "ab", "z", "fatigue", "qq"]:
+            key = normalize(prefix)
+            candidates = []
+            for name in counts:
+                words = normalize(name)
+                starts = [0] + [m.end() for m in re.finditer(" ", words)]
+                if words.startswith(key):
+                    candidates.append((0, -counts[name], name))
+                elif any(words[start:].startswith(key) for start in starts):
+                    candidates.append((1, -counts[name], name))
+            expected = [(name, -count) for _, count, name in sorted(candidates)[:5]]
+            self.assertEqual(trie.complete(prefix, 5), expected, msg=prefix)
+
+    def test_suggest_endpoint(self):
+        response = self.client.get("/api/symptoms/suggest/", {"q": "skin", "k": 3})
+        self.assertEqual(response.status_code, 200)
+        suggestions = response.json()["suggestions"]
+        self.assertEqual(len(suggestions), 3)
+        self.assertTrue(all("skin" in normalize(s["name"]) for s in suggestions))
+        self.assertEqual(self.client.get("/api/symptoms/suggest/", {"q": "x", "k": "a"}).status_code, 400)
+
+    def test_clarification_session_matches_recompute(self):
+        rng = random.Random(3)
+        checked = 0
+        for _ in range(300):
+            symptoms = ",".join(rng.sample(self.names, rng.randint(1, 3)))
+            body = self.client.post("/api/report/symptoms/", {"symptoms": symptoms}).json()
+            if "clarify_session" not in body:
+                continue
+            clarification = rng.choice(body["symptom_options"])
+            with_session = self.client.post("/api/report/clarify/", {
+                "symptom_base": symptoms, "clarification": clarification,
+                "clarify_session": body["clarify_session"],
+            })
+            recomputed = self.client.post("/api/report/clarify/", {
+                "symptom_base": symptoms, "clarification": clarification,
+            })
+            self.assertEqual(with_session.json()["symptom_diseases"], recomputed.json()["symptom_diseases"],
+                             msg=f"{symptoms} + {clarification}")
+            checked += 1
+        self.assertGreater(checked, 20)
+
+
+# ======== Medicine Table =========
+@override_settings(SYMPTOM_CATALOG_POLL_SECONDS=0)
+class MedicineTableTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for name, count in (("Diabetes (Type 2)", 7), ("Bronchial Asthma", 2), ("Asthma", 1),
+                            ("Common Cold", 3), ("Migraine", 0)):
+            disease = Disease.objects.create(name=name)
+            for i in range(count):
+                Medicine.objects.create(name=f"{name} drug {i}", link=f"https://example.com/{disease.pk}/{i}",
+                                        disease=disease)
+
+    def first_medicines(self, disease_name):
+        """What the per-request lookup used to return for a disease."""
+        meds = Medicine.objects.filter(disease=Disease.objects.get(name=disease_name))[:5]
+        return [{"name": med.name, "link": med.link} for med in meds]
+
+    def test_lookup_matches_per_request_query(self):
+        table = get_medicine_table()
+        for name in Disease.objects.values_list("name", flat=True):
+            self.assertEqual(table.lookup(name), self.first_medicines(name), msg=name)
+        self.assertEqual(len(table.lookup("Diabetes (Type 2)")), 5)
+
+    def test_resolution_order(self):
+        table = get_medicine_table()
+        self.assertEqual(table.lookup("diabetes"), self.first_medicines("Diabetes (Type 2)"))
+        # An exact name wins over the first name containing it
+        self.assertEqual(table.lookup("ASTHMA "), self.first_medicines("Asthma"))
+        self.assertEqual(table.lookup("bronchial"), self.first_medicines("Bronchial Asthma"))
+        self.assertEqual(table.lookup("Comon Cold"), self.first_medicines("Common Cold"))
+        self.assertEqual(table.lookup(""), [])
+        self.assertEqual(table.lookup("teleportation sickness"), [])
+
+    def test_lookups_are_copies(self):
+        get_medicine_table().lookup("asthma")[0]["name"] = "changed"
+        self.assertEqual(get_medicine_table().lookup("asthma"), self.first_medicines("Asthma"))
+
+    def test_rebuilt_when_catalog_changes(self):
+        table = get_medicine_table()
+        self.assertIs(get_medicine_table(), table)
+        Medicine.objects.create(name="Sumatriptan", link="https://example.com/sumatriptan",
+                                disease=Disease.objects.get(name="Migraine"))
+        self.assertIsNot(get_medicine_table(), table)
+        self.assertEqual([med["name"] for med in views.get_medicine_for_disease("migraine")], ["Sumatriptan"])
+
+
+# ======== Side Effect Store =========
+LABEL_DUMP = {"results": [
+    {"openfda": {"generic_name": ["METFORMIN HYDROCHLORIDE"]}, "adverse_reactions": ["Diarrhea, nausea."]},
+    {"openfda": {"generic_name": ["Ibuprofen"]}, "warnings": "Stomach bleeding warning."},
+    {"openfda": {"generic_name": ["Ibuprofen"]}, "adverse_reactions": ["Dyspepsia."]},
+    {"openfda": {"generic_name": ["Placebo"]}},
+]}
+
+
+class FailingUpstream:
+    calls = 0
+
+    def fetch(self, name):
+        FailingUpstream.calls += 1
+        raise ConnectionError("openFDA is down")
+
+
+@override_settings(SIDE_EFFECTS_UPSTREAM="ocr_app.services.side_effects.LabelDumpUpstream",
+                   SIDE_EFFECTS_TTL=3600, SIDE_EFFECTS_MISS_TTL=60, SIDE_EFFECTS_STALE_TTL=86400,
+                   SIDE_EFFECTS_BACKOFF_SECONDS=60)
+class SideEffectStoreTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dump = os.path.join(tmp.name, "drug-label.json")
+        with open(self.dump, "w", encoding="utf-8") as f:
+            json.dump(LABEL_DUMP, f)
+        settings_override = override_settings(SIDE_EFFECTS_LABEL_DUMP=self.dump)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.store = SideEffectStore()
+
+    def fetches(self):
+        return mock.patch.object(self.store.upstream, "fetch", wraps=self.store.upstream.fetch)
+
+    def store_entry(self, name, side_effects, age, found=True):
+        return SideEffectLabel.objects.create(name=name, side_effects=side_effects, found=found,
+                                              source="upstream", fetched_at=timezone.now() - age)
+
+    def test_fetched_once_then_served_from_store(self):
+        with self.fetches() as fetch:
+            self.assertEqual(self.store.get(" Metformin  Hydrochloride"), ["Diarrhea, nausea."])
+            self.assertEqual(self.store.get("metformin hydrochloride"), ["Diarrhea, nausea."])
+        fetch.assert_called_once_with("metformin hydrochloride")
+        entry = SideEffectLabel.objects.get(name="metformin hydrochloride")
+        self.assertEqual((entry.found, entry.source), (True, "upstream"))
+
+    def test_misses_are_stored(self):
+        with self.fetches() as fetch:
+            self.assertEqual(self.store.get("placebo"), NOT_FOUND)
+            self.assertEqual(self.store.get("placebo"), NOT_FOUND)
+        fetch.assert_called_once()
+        self.assertFalse(SideEffectLabel.objects.get(name="placebo").found)
+
+    def test_expired_entries_are_fetched_again(self):
+        self.store_entry("ibuprofen", ["Old label."], timedelta(days=2))
+        self.store_entry("placebo", NOT_FOUND, timedelta(days=2), found=False)
+        with self.fetches() as fetch:
+            self.assertEqual(self.store.get("ibuprofen"), ["Dyspepsia."])
+            self.assertEqual(self.store.get("placebo"), NOT_FOUND)
+        self.assertEqual(fetch.call_count, 2)
+        self.assertEqual(SideEffectLabel.objects.get(name="ibuprofen").side_effects, ["Dyspepsia."])
+
+    def test_stale_entries_are_served_while_refreshing(self):
+        self.store_entry("ibuprofen", ["Old label."], timedelta(hours=2))
+        with self.fetches() as fetch, mock.patch.object(self.store, "refresh_later") as refresh_later:
+            self.assertEqual(self.store.get("ibuprofen"), ["Old label."])
+        fetch.assert_not_called()
+        refresh_later.assert_called_once_with("ibuprofen")
+
+        with mock.patch("ocr_app.services.side_effects.close_old_connections"):
+            self.store._background_refresh("ibuprofen")
+        self.assertEqual(self.store.get("ibuprofen"), ["Dyspepsia."])
+
+    def test_misses_expire_sooner(self):
+        self.store_entry("ibuprofen", ["Old label."], timedelta(minutes=5))
+        self.store_entry("placebo", NOT_FOUND, timedelta(minutes=5), found=False)
+        with mock.patch.object(self.store, "refresh_later") as refresh_later:
+            self.assertEqual(self.store.get("ibuprofen"), ["Old label."])
+            self.assertEqual(self.store.get("placebo"), NOT_FOUND)
+        refresh_later.assert_called_once_with("placebo")
+
+    def test_long_names_are_not_looked_up(self):
+        name = "x" * (MAX_NAME_LENGTH + 1)
+        with self.fetches() as fetch:
+            self.assertEqual(self.store.get(name), NOT_FOUND)
+        fetch.assert_not_called()
+        self.assertFalse(SideEffectLabel.objects.exists())
+
+        response = self.client.post("/api/medicine/side-effects/", {"medicine_name": name})
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(SIDE_EFFECTS_UPSTREAM="ocr_app.tests.FailingUpstream")
+    def test_failing_upstream_backs_off(self):
+        self.store_entry("ibuprofen", ["Old label."], timedelta(days=2))
+        calls = FailingUpstream.calls
+
+        self.assertEqual(self.store.get("ibuprofen"), ["Old label."])
+        self.assertEqual(FailingUpstream.calls - calls, 1)
+        self.assertEqual(cache.get(backoff_key()), "openFDA is down")
+
+        # Backing off: stored entries are served, missing ones report the error
+        self.assertEqual(self.store.get("ibuprofen"), ["Old label."])
+        self.assertEqual(self.store.get("metformin"), ["API error: openFDA is down"])
+        self.assertEqual(FailingUpstream.calls - calls, 1)
+
+        cache.delete(backoff_key())
+        self.assertEqual(self.store.get("metformin"), ["API error: openFDA is down"])
+        self.assertEqual(FailingUpstream.calls - calls, 2)
+        self.assertFalse(SideEffectLabel.objects.filter(name="metformin").exists())
+
+    def test_backoff_is_per_upstream(self):
+        with override_settings(SIDE_EFFECTS_UPSTREAM="ocr_app.tests.FailingUpstream"):
+            self.store.get("ibuprofen")
+        self.assertEqual(self.store.get("ibuprofen"), ["Dyspepsia."])
+
+    def test_import_label_dump(self):
+        out = io.StringIO()
+        call_command("i_side_effects", self.dump, stdout=out)
+        self.assertIn("2 drugs", out.getvalue())
+        labels = dict(SideEffectLabel.objects.values_list("name", "side_effects"))
+        # A label with adverse reactions wins over an earlier one with only warnings
+        self.assertEqual(labels, {"metformin hydrochloride": ["Diarrhea, nausea."], "ibuprofen": ["Dyspepsia."]})
+        self.assertEqual(set(SideEffectLabel.objects.values_list("source", flat=True)), {"import"})
+
+        # Imported drugs are served without the upstream, and re-imports update them
+        with self.fetches() as fetch:
+            self.assertEqual(self.store.get("Ibuprofen"), ["Dyspepsia."])
+        fetch.assert_not_called()
+        call_command("i_side_effects", self.dump, stdout=io.StringIO())
+        self.assertEqual(SideEffectLabel.objects.count(), 2)
@@ -1,15 +1,20 @@
 from django.urls import path
 from . import views
-from .views import SymptomListView
+from .views import SymptomListView, OcrCacheStatsView
 
 
 urlpatterns = [
     path('api/report/ocr/', views.handle_ocr),
+    path('api/report/ocr/jobs/', views.submit_ocr),
+    path('api/report/ocr/cache/', OcrCacheStatsView.as_view(), name='ocr-cache-stats'),
+    path('api/report/ocr/jobs/<uuid:job_id>/', views.ocr_job_status),
+    path('api/report/batch/', views.handle_batch),
     path('api/report/symptoms/', views.handle_symptoms),
     path('api/report/clarify/', views.handle_clarification),
     path('api/medicine/side-effects/', views.handle_side_effects),
     path('api/report/pdf/', views.download_pdf),
     path('api/report/save/', views.handle_save_report),
     path('api/symptoms/list/', SymptomListView.as_view(), name='symptom-list'),
+    path('api/symptoms/suggest/', views.suggest_symptoms, name='symptom-suggest'),
     
 ]
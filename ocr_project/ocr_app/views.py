@@ -1,211 +1,88 @@
 # views.py
-import matplotlib
-matplotlib.use('Agg') 
-import pytesseract
-pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
-
-import os, re, json
-import pandas as pd
-import numpy as np
+import re, json
 from django.shortcuts import render
 from django.views.decorators.csrf import csrf_exempt
-from .models import Symptom, Medicine, Disease
-from pdf2image import convert_from_bytes
-from pytesseract import image_to_string
-from sklearn.linear_model import LogisticRegression
-from django.http import HttpResponse, FileResponse, JsonResponse
+from django.views.decorators.http import condition
+from django.utils.decorators import method_decorator
+from .models import OcrJob
+from django.http import HttpResponse, FileResponse, JsonResponse, StreamingHttpResponse
 from accounts.models import SentSymptomReport
 
-from sklearn.preprocessing import LabelEncoder
-from PIL import Image
-import difflib
-import requests
+from .services.ocr import run_ocr, text_result
+from .services import ocr_cache
+from .services.jobs import submit_ocr_job, expire_stale_job, job_status_payload
+from .services.report_parser import (
+    FEATURE_SYNONYMS, scan_report
+)
+from .services.symptom_catalog import correct_symptoms, get_catalog
+from .services.clarification import create_session, narrow_session
+from .services.symptom_ranker import get_symptom_ranker
+from .services.medicine_table import get_medicine_table
+from .services.side_effects import MAX_NAME_LENGTH, side_effect_store
 from django.conf import settings
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from io import BytesIO
 from datetime import datetime
-from django.http import FileResponse
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-import matplotlib.pyplot as plt
-from reportlab.lib.utils import ImageReader
-from django.http import JsonResponse
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import IsAdminUser
 from rest_framework_simplejwt.tokens import RefreshToken
 
 
-font_path = os.path.join(os.path.dirname(__file__), 'NotoSansDevanagari-Regular.ttf')
-
-# ✅ Register the font with ReportLab
-pdfmetrics.registerFont(TTFont('NotoHindi', font_path))
-
-def draw_chart(matched_parameters):
-    labels = list(matched_parameters.keys())[:5]  # limit chart for space
-    values = [float(matched_parameters[k]) for k in labels]
-
-    plt.figure(figsize=(6, 3))
-    plt.barh(labels, values, color='teal')
-    plt.title("Extracted Parameter Values")
-    plt.tight_layout()
-
-    chart_buffer = BytesIO()
-    plt.savefig(chart_buffer, format='PNG')
-    chart_buffer.seek(0)
-    plt.close()
-    return chart_buffer
-
+# ======== Load Models =========
+# Models and thresholds of the active release, loaded lazily on first use,
+# see services/disease_models.py and services/model_store.py
+from .services.model_store import models, current_release, current_thresholds, use_release
 
-# Add this after importing os
-POPPLER_PATH = r"C:\Users\ayush\Downloads\poppler-24.08.0\Library\bin"
-os.environ["PATH"] += os.pathsep + POPPLER_PATH
 
-# ======== Load Models =========
-def load_model(path, target_column):
-    df = pd.read_csv(os.path.join(os.path.dirname(__file__), path)).dropna()
-
-    # Normalize string target values
-    if df[target_column].dtype == 'object':
-        df[target_column] = df[target_column].map({'ckd': 1, 'notckd': 0})
-
-    # Normalize 2 → 0 if binary target column has values like 1/2
-    unique_vals = df[target_column].dropna().unique()
-    if sorted(unique_vals.tolist()) == [1, 2]:
-        df[target_column] = df[target_column].map({1: 1, 2: 0})
-
-    # Encode input features
-    for col in df.columns:
-        if df[col].dtype == 'object' and col != target_column:
-            df[col] = LabelEncoder().fit_transform(df[col])
-
-    X = df.drop(columns=[target_column])
-    y = df[target_column]
-
-    model = LogisticRegression(max_iter=10000, solver="liblinear", class_weight="balanced")
-    model.fit(X, y)
-    return model, X.columns.tolist()
-
-
-models = {
-    "diabetes": load_model("diabetes.csv", "Outcome"),
-    "heart": load_model("heart.csv", "target"),
-    "liver": load_model("indian_liver_patient.csv", "Dataset"),
-    "kidney": load_model("kidney_disease.csv", "classification"),
-    "dengue": load_model("Dengue diseases dataset.csv", "Final Output")
-}
-
-def extract_text_from_any_file(file):
-    name = file.name.lower()
-
-    if name.endswith(".pdf"):
-        images = convert_from_bytes(file.read())
-    elif name.endswith((".jpg", ".jpeg", ".png", ".bmp")):
-        images = [Image.open(file)]
-    elif name.endswith(".txt"):
-        return file.read().decode("utf-8")
-    else:
-        raise ValueError("Unsupported file format.")
+def unsettled_report_parameters(text, disease):
+    """
+    Threshold parameters of `disease` that more pages could still change:
+    missing, or only found through a lower-priority alias.
+    """
+    scan = scan_report(text)
+    return [
+        key for key, limits in current_thresholds().get(disease.lower(), {}).items()
+        if scan.threshold_match(limits.get("aliases", [key]))[1] != 0
+    ]
 
-    full_text = "\n".join(image_to_string(img) for img in images)
-    return full_text
 
-import re
-from datetime import datetime
+def report_stop_condition(disease):
+    """Stop OCR once every threshold parameter of the target disease is settled."""
+    if not getattr(settings, "OCR_EARLY_STOP", True) or disease.lower() not in current_thresholds():
+        return None
+    return lambda text: not unsettled_report_parameters(text, disease)
 
-def check_report_status(text, disease):
-    synonym_thresholds = {
-        "diabetes": {
-            "FBS": {
-                "aliases": ["FBS", "Fasting Blood Sugar", "Fasting Glucose", "GLUCOSE, FASTING", "Glucose Fasting"],
-                "ranges": {
-                    "ok": (0, 99),
-                    "prediabetes": (100, 125),
-                    "abnormal": (126, float("inf"))
-                }
-            },
-            "HbA1c": {
-                "aliases": ["HbA1c", "A1C", "Glycated Hemoglobin", "GLYCOSYLATED HEMOGLOBIN"],
-                "ranges": {
-                    "ok": (0, 5.6),
-                    "prediabetes": (5.7, 6.4),
-                    "abnormal": (6.5, float("inf"))
-                }
-            },
-            "Glucose": {
-                "aliases": ["Glucose", "RBS", "Random Blood Sugar", "Blood Sugar"],
-                "ranges": {
-                    "ok": (0, 99),
-                    "prediabetes": (100, 125),
-                    "abnormal": (126, float("inf"))
-                }
-            }
-        },
-        "kidney": {
-            "Creatinine": {"aliases": ["Creatinine", "Serum Creatinine"], "max": 1.3},
-            "Urea": {"aliases": ["Urea", "Blood Urea"], "max": 43},
-            "Sodium": {"aliases": ["Sodium", "Na+"], "min": 135, "max": 145},
-            "Potassium": {"aliases": ["Potassium", "K+"], "max": 5.0}
-        },
-        "liver": {
-            "Total Bilirubin": {"aliases": ["Total Bilirubin", "Bilirubin Total"], "max": 1.2},
-            "Direct Bilirubin": {"aliases": ["Direct Bilirubin", "Bilirubin Direct"], "max": 0.2},
-            "AST": {"aliases": ["AST", "SGOT"], "max": 35},
-            "ALT": {"aliases": ["ALT", "SGPT"], "max": 45},
-            "Alkaline Phosphatase": {"aliases": ["Alkaline Phosphatase", "ALP"], "min": 40, "max": 129}
-        },
-        "heart": {
-            "EF": {"aliases": ["EF", "Ejection Fraction"], "min": 55},
-            "PASP": {"aliases": ["PASP"], "max": 35},
-            "Peak TR Velocity": {"aliases": ["Peak TR Velocity"], "max": 2.8}
-        },
-        "dengue": {
-            "WBC": {"aliases": ["WBC", "WBC Count"], "min": 4000, "max": 11000},
-            "Platelets": {"aliases": ["Platelet Count", "Platelets"], "min": 150000},
-            "IgM": {"aliases": ["IgM", "DENGUE FEVER ANTIBODY, IgM"], "min": 1.1},
-            "IgG": {"aliases": ["IgG", "DENGUE FEVER ANTIBODY, IgG"], "min": 2.2}
-        }
-    }
 
+def check_report_status(text, disease, scan=None):
     disease = disease.lower()
-    check_map = synonym_thresholds.get(disease, {})
+    check_map = current_thresholds().get(disease, {})
+    values = (scan or scan_report(text)).thresholds(disease, current_thresholds())
     results = {}
 
     for key, limits in check_map.items():
-        aliases = limits.get("aliases", [key])
-        found = False
-        for label in aliases:
-            match = re.search(rf"{label}.*?(-?\d+\.\d+)", text, re.IGNORECASE | re.DOTALL)
-            if not match:
-                match = re.search(rf"{label}.*?[^\d\-\.](-?\d+\.\d+)", text, re.IGNORECASE)
-            if match:
-                val = float(match.group(1))
-                found = True
-
-                if "ranges" in limits:
-                    status = "unknown"
-                    for label_status, (low, high) in limits["ranges"].items():
-                        if low <= val <= high:
-                            status = label_status
-                            break
-                else:
-                    min_val = limits.get("min", float("-inf"))
-                    max_val = limits.get("max", float("inf"))
-                    if val < min_val or val > max_val:
-                        status = "abnormal"
-                    else:
-                        status = "positive" if key in ["IgM", "IgG"] else "ok"
-
-                results[key] = {
-                    "value": val,
-                    "status": status
-                }
-                break
-
-        if not found:
+        val = values[key]
+        if val is None:
             results[key] = {"value": None, "status": "missing"}
+            continue
+
+        if "ranges" in limits:
+            status = "unknown"
+            for label_status, (low, high) in limits["ranges"].items():
+                if low <= val <= high:
+                    status = label_status
+                    break
+        else:
+            min_val = limits.get("min", float("-inf"))
+            max_val = limits.get("max", float("inf"))
+            if val < min_val or val > max_val:
+                status = "abnormal"
+            else:
+                status = "positive" if key in ["IgM", "IgG"] else "ok"
+
+        results[key] = {
+            "value": val,
+            "status": status
+        }
 
     # Conclusion
     abnormal = [k for k, v in results.items() if v["status"] in ["abnormal", "positive"]]
@@ -296,6 +173,21 @@ def check_report_status(text, disease):
             "Follow up with LFT (Liver Function Tests) if needed."
         ]
 
+    elif disease == "thyroid":
+        tsh = results.get("TSH", {}).get("value")
+        if tsh is not None and tsh > 4.5:
+            recommendation = "⚠️ High TSH. Possible hypothyroidism. Endocrinologist consultation advised."
+        elif tsh is not None and tsh < 0.4:
+            recommendation = "⚠️ Low TSH. Possible hyperthyroidism. Endocrinologist consultation advised."
+        else:
+            recommendation = "🟢 TSH appears within normal limits."
+
+        possible_treatments = [
+            "Repeat thyroid function tests (TSH, T3, T4) to confirm.",
+            "Doctors may prescribe Levothyroxine for an underactive thyroid.",
+            "Follow up regularly to adjust the dose."
+        ]
+
     return {
         "status": status,
         "details": results,
@@ -309,81 +201,14 @@ def check_report_status(text, disease):
 
 # ========== Core AI Functions ==========
 
-def match_parameters(text, expected_cols, disease=None):
-    synonym_map = {
-        "diabetes": {
-            "Pregnancies": ["Pregnancies"],
-            "Glucose": ["Glucose", "RBS", "Random Blood Sugar", "Blood Sugar"],
-            "BloodPressure": ["BloodPressure", "BP"],
-            "SkinThickness": ["SkinThickness"],
-            "Insulin": ["Insulin"],
-            "BMI": ["BMI"],
-            "DiabetesPedigreeFunction": ["DiabetesPedigreeFunction"],
-            "Age": ["Age"],
-            "FBS": ["FBS", "Fasting Blood Sugar", "Fasting Glucose", "GLUCOSE, FASTING", "Glucose Fasting"],
-            "HbA1c": ["HbA1c", "Glycated Hemoglobin", "A1C"]
-        },
-        "kidney": {
-            "age": ["Age"],
-            "bp": ["BP", "Blood Pressure"],
-            "sg": ["Specific Gravity", "SG"],
-            "al": ["Albumin"],
-            "su": ["Sugar"],
-            "rbc": ["RBC"],
-            "pc": ["Pus Cells"],
-            "pcc": ["Pus Cell Clumps"],
-            "ba": ["Bacteria"],
-            "bgr": ["Blood Glucose Random", "BGR"],
-            "bu": ["Blood Urea", "BU"],
-            "sc": ["Serum Creatinine", "SC"],
-            "sod": ["Sodium", "Na+"],
-            "pot": ["Potassium", "K+"],
-            "hemo": ["Hemoglobin", "HGB", "HB"],
-            "pcv": ["Packed Cell Volume", "PCV"],
-            "wc": ["WBC Count", "WC"],
-            "rc": ["RBC Count", "RC"]
-        },
-        "liver": {
-            "Age": ["Age"],
-            "Gender": ["Sex", "Gender"],
-            "Total_Bilirubin": ["Total Bilirubin", "Bilirubin Total", "SERUM BILIRUBIN (TOTAL)",""],
-            "Direct_Bilirubin": ["Direct Bilirubin", "Bilirubin Direct", "SERUM BILIRUBIN (DIRECT)"],
-            "Alkaline_Phosphotase": ["Alkaline Phosphatase", "ALK PHOS", "ALP"],
-            "Alamine_Aminotransferase": ["ALT", "SGPT", "ALT (SGPT)"],
-            "Aspartate_Aminotransferase": ["AST", "SGOT"],
-            "Total_Protiens": ["Total Protein", "TP"],
-            "Albumin": ["Albumin", "ALB"],
-            "Albumin_and_Globulin_Ratio": ["A/G", "AG Ratio", "Albumin/Globulin Ratio","(A/G)Ratio"]
-        },
-        "dengue": {
-            "WBC": ["WBC Count", "White Blood Cells"],
-            "Platelets": ["Platelet Count", "Platelets"],
-            "Hemoglobin": ["Hemoglobin", "Hb", "HGB"],
-            "RBC": ["RBC Count", "RBC"],
-            "HCT": ["Hematocrit", "HCT"],
-            "NS1": ["NS1 Antigen"],
-            "IgM": ["IgM", "DENGUE IgM"],
-            "IgG": ["IgG", "DENGUE IgG"]
-        }
-    }
+def match_parameters(text, expected_cols, disease=None, scan=None):
+    scan = scan or scan_report(text)
+    used_map = FEATURE_SYNONYMS.get(disease.lower(), {}) if disease else {}
 
     matched = {}
-    used_map = synonym_map.get(disease.lower(), {}) if disease else {}
-
     for col in expected_cols:
-        synonyms = used_map.get(col, [col])
-        found = False
-        for label in synonyms:
-            match = re.search(rf"{label}\s*[:\-]?\s*(\d+\.?\d*)", text, re.IGNORECASE)
-            if match:
-                try:
-                    matched[col] = float(match.group(1))
-                    found = True
-                    break
-                except:
-                    continue
-        if not found:
-            matched[col] = 0
+        value = scan.feature_value(used_map.get(col, [col]))
+        matched[col] = value if value is not None else 0
 
     return matched
 
@@ -413,137 +238,102 @@ def determine_severity(thresholds):
 
 
 
-def predict_disease(text):
-    predictions = {}
+def report_supported(disease):
+    """A report can be checked for `disease`: it has a model and a threshold table."""
+    return disease in models and disease in current_thresholds()
+
 
-    for disease, (model, cols) in models.items():
-        input_data = match_parameters(text, cols, disease)
-        values_df = pd.DataFrame([input_data], columns=cols)
+def analyze_disease(text, disease, scan=None):
+    """
+    Model prediction + threshold check for one disease, from a single
+    parse of the report. Returns (prediction, threshold_result), where
+    threshold_result is the full check_report_status() output.
+    """
+    return analyze_reports([text], disease, [scan])[0]
 
-        pred = model.predict(values_df)[0]
 
+def analyze_reports(texts, disease, scans=None):
+    """
+    analyze_disease() for many reports at once: the model features of all
+    reports are stacked into one matrix and scored in a single call.
+    """
+    model, cols = models[disease]
+    scans = [scan or scan_report(text) for text, scan in zip(texts, scans or [None] * len(texts))]
+    inputs = [match_parameters(text, cols, disease, scan) for text, scan in zip(texts, scans)]
+
+    engine = models.engine()
+    if getattr(settings, "MODEL_INFERENCE", "numpy") == "numpy" and disease in engine:
+        preds, _ = engine.score(disease, engine.pack_rows(disease, inputs))
+    else:
+        import pandas as pd
+        values_df = pd.DataFrame(inputs, columns=cols)
+        preds = model.predict(values_df)
+
+    results = []
+    for text, scan, input_data, pred in zip(texts, scans, inputs, preds):
         # 👇 Evaluate threshold values for severity (from report text)
-        threshold_result = check_report_status(text, disease)
+        threshold_result = check_report_status(text, disease, scan)
         severity = determine_severity(threshold_result["details"])
 
-        predictions[disease] = {
+        prediction = {
             "prediction": int(pred),
             "matched_parameters": input_data,
             "severity": severity,  # 👈 Add this line
             "threshold_status": threshold_result["status"],
-            "threshold_details": threshold_result["details"]
+            "threshold_details": threshold_result["details"],
+            "model_version": current_release().version
         }
+        results.append((prediction, threshold_result))
+    return results
 
-    return predictions
 
+def predict_disease(text, diseases=None):
+    """Predictions for `diseases` (all models when None) keyed by disease."""
+    diseases = list(models.keys()) if diseases is None else [d for d in diseases if d in models]
+    for disease in diseases:
+        models[disease]  # load first so the scan indexes the model's columns
+    scan = scan_report(text)
 
+    return {
+        disease: analyze_disease(text, disease, scan)[0]
+        for disease in diseases
+    }
 
-def get_disease_from_symptoms(symptoms):
-    all_symptoms = Symptom.objects.values_list('name', flat=True)
-    corrected = []
-    for s in symptoms:
-        best = difflib.get_close_matches(s, all_symptoms, n=1)
-        if best:
-            corrected.append(best[0])
-    return corrected
 
-def clarify_disease(symptom_list):
-    qs = Symptom.objects.filter(name__in=symptom_list).prefetch_related('diseases')
-    disease_symptom_map = {}
 
-    for sym in qs:
-        for d in sym.diseases.all():
-            if d.name not in disease_symptom_map:
-                disease_symptom_map[d.name] = set()
-            disease_symptom_map[d.name].add(sym.name)
+def get_disease_from_symptoms(symptoms):
+    # Fuzzy match against the in-memory symptom index, see services/symptom_catalog.py
+    return correct_symptoms(symptoms)
 
-    sorted_dis = sorted(disease_symptom_map.items(), key=lambda x: -len(x[1]))
+def clarify_disease(symptom_list):
+    """
+    Diseases ranked by how many of the symptoms they have, as
+    [(disease, {matched symptoms}), ...], plus up to 3 follow-up symptoms
+    to ask about when the top diseases are tied.
+    """
+    incidence = get_catalog().incidence
+    sorted_dis = incidence.rank(symptom_list)
 
     if len(sorted_dis) > 1 and len(sorted_dis[0][1]) == len(sorted_dis[1][1]):
-        top_diseases = sorted_dis[:2]
-        all_symptoms = set()
-        for _, syms in top_diseases:
-            all_symptoms |= syms
-        options = list(all_symptoms - set(symptom_list))[:3]  # suggest up to 3 new symptoms
+        tied = [name for name, syms in sorted_dis if len(syms) == len(sorted_dis[0][1])]
+        options = incidence.followups(tied, exclude=symptom_list)  # suggest up to 3 new symptoms
         return sorted_dis, options
 
     return sorted_dis, []
 
 def get_medicine_for_disease(disease_name):
-    # Normalize input
-    disease_name = disease_name.strip().lower()
-
-    # Optional: map simplified AI/ML keys to actual DB entries
-    DISEASE_MAPPING = {
-        "diabetes": "Diabetes (Type 2)",
-        "heart": "Heart attack",
-        "kidney": "Chronic cholestasis",
-        "liver": "Alcoholic hepatitis",
-        "cold": "Common Cold",
-        "flu": "Colds & Flu",
-        "hypertension": "Hypertension",
-        "hepatitis": "Hepatitis B",
-        "cancer": "Cancer",
-        "migraine": "Migraine",
-        "pneumonia": "Pneumonia",
-        "dengue": "Dengue",
-        "aids": "AIDS/HIV",
-        "allergy": "Allergy",
-        "asthma": "Asthma",
-        "thyroid": "Hypothyroidism",
-        # ➕ Add more mappings as needed
-    }
-
-    # Use mapping if available
-    mapped_name = DISEASE_MAPPING.get(disease_name, disease_name)
-
-    # Search for disease in DB
-    disease_qs = Disease.objects.filter(name__icontains=mapped_name)
-    if disease_qs.exists():
-        disease = disease_qs.first()
-        meds = Medicine.objects.filter(disease=disease)[:5]
-        return [{'name': med.name, 'link': med.link} for med in meds]
-
-    return []
-
+    return get_medicine_table().lookup(disease_name)
 
 
 def fetch_side_effects(medicine_name):
-    base_url = "https://api.fda.gov/drug/label.json"
-    params = {
-        "search": f"openfda.generic_name:{medicine_name}",
-        "limit": 1
-    }
-
-    try:
-        response = requests.get(base_url, params=params)
-        data = response.json()
-
-        # Try to get adverse reactions, if not found, get warnings
-        if "results" in data and data["results"]:
-            drug_data = data["results"][0]
-            side_effects = drug_data.get("adverse_reactions", None)
-            if not side_effects:
-                side_effects = drug_data.get("warnings", ["No side effects found."])
-
-            # Format into a list
-            if isinstance(side_effects, list):
-                return side_effects
-            elif isinstance(side_effects, str):
-                return [side_effects]
-
-        return ["No side effects found."]
-    
-    except Exception as e:
-        return [f"API error: {str(e)}"]
+    return side_effect_store.get(medicine_name)
 
     
 def analyze_report_text(text, disease):
     """
     Combines model prediction + threshold evaluation + treatment advice
     """
-    predictions = predict_disease(text)
-    if disease not in predictions:
+    if not report_supported(disease):
         return {
             "severity": "Unknown",
             "matched_parameters": {},
@@ -554,8 +344,7 @@ def analyze_report_text(text, disease):
             "final_decision": "Diagnosis unavailable"
         }
 
-    result = predictions[disease]
-    thresholds = check_report_status(text, disease)
+    result, thresholds = analyze_disease(text, disease)
     meds = get_medicine_for_disease(disease)
 
     return {
@@ -565,106 +354,22 @@ def analyze_report_text(text, disease):
         "threshold_details": thresholds["details"],
         "recommendations": thresholds["possible_treatments"],
         "medicines": meds,
-        "final_decision": thresholds["recommendation"]
+        "final_decision": thresholds["recommendation"],
+        "model_version": result["model_version"]
     }
 
     
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from io import BytesIO
-from django.http import FileResponse
-
-def generate_diagnosis_pdf(disease_name, prediction_data, thresholds=None, medicines=None, show_threshold_only=False, final_decision=None):
-    buffer = BytesIO()
-    c = canvas.Canvas(buffer, pagesize=A4)
-    width, height = A4
-    y = height - 50
-
-    # Header
-    c.setFont("Helvetica-Bold", 16)
-    c.drawString(50, y, "🩺 Scan2Heal - Diagnostic Report")
-    y -= 40
-
-    c.setFont("Helvetica", 12)
-    c.drawString(50, y, f"Disease: {disease_name}")
-    y -= 20
-    c.drawString(50, y, f"Final Decision: {final_decision}")
-    y -= 30
-
-    # Severity
-    c.setFont("Helvetica-Bold", 14)
-    c.drawString(50, y, "Severity:")
-    y -= 20
-    c.setFont("Helvetica", 12)
-    c.drawString(60, y, prediction_data.get("severity", "N/A"))
-    y -= 30
-
-    # Threshold Status
-    if not show_threshold_only:
-        c.setFont("Helvetica-Bold", 14)
-        c.drawString(50, y, "Threshold Status:")
-        y -= 20
-        c.setFont("Helvetica", 12)
-        c.drawString(60, y, prediction_data.get("threshold_status", "N/A"))
-        y -= 20
-
-    # Threshold Parameters
-    threshold_data = prediction_data.get("threshold_details", {})
-    if threshold_data:
-        c.setFont("Helvetica-Bold", 14)
-        c.drawString(50, y, "Threshold Parameters:")
-        y -= 20
-        c.setFont("Helvetica", 12)
-        for param, obj in threshold_data.items():
-            val = obj.get("value", "None")
-            status = obj.get("status", "unknown")
-            c.drawString(60, y, f"{param}: {val} → {status}")
-            y -= 15
-        y -= 10
-
-    # Recommendations
-    recommendations = prediction_data.get("recommendations", [])
-    if recommendations:
-        c.setFont("Helvetica-Bold", 14)
-        c.drawString(50, y, "Recommendations:")
-        y -= 20
-        c.setFont("Helvetica", 12)
-        for rec in recommendations:
-            c.drawString(60, y, f"- {rec}")
-            y -= 15
-        y -= 10
-
-    # Medicines
-    if medicines:
-        c.setFont("Helvetica-Bold", 14)
-        c.drawString(50, y, "Medicines:")
-        y -= 20
-        c.setFont("Helvetica", 12)
-        for med in medicines:
-            name = med.get("name", "Unnamed")
-            link = med.get("link", "No Link")
-            c.drawString(60, y, f"{name} - {link}")
-            y -= 15
-
-    c.save()
-    buffer.seek(0)
-    return buffer  # ✅ Return the full buffer, not .getvalue()
-
-
-
-
 def download_report_pdf(request):
     if request.method == 'POST':
         disease = request.POST.get("disease", "Unknown Disease")
         ocr_text = request.POST.get("ocr_text", "")
 
         # Run prediction
-        predictions = predict_disease(ocr_text)
-        if disease not in predictions:
+        if not report_supported(disease):
             return HttpResponse("Invalid disease", status=400)
 
-        result = predictions[disease]  # contains matched_parameters, severity, etc.
-        thresholds = check_report_status(ocr_text, disease)  # contains threshold_details
+        # result contains matched_parameters, severity, etc., thresholds the threshold_details
+        result, thresholds = analyze_disease(ocr_text, disease)
 
         # ✅ Inject matched parameter values into thresholds if available
         for key, val in result.get("matched_parameters", {}).items():
@@ -678,6 +383,7 @@ def download_report_pdf(request):
         result["threshold_details"] = thresholds["details"]
 
         # Generate PDF
+        from .services.pdf import generate_diagnosis_pdf
         pdf_buffer = generate_diagnosis_pdf(
             disease_name=disease,
             prediction_data=result,
@@ -697,6 +403,48 @@ def download_report_pdf(request):
     return HttpResponse("Method not allowed", status=405)
 
 
+def build_ocr_response(ocr, disease_key, analysis=None):
+    """
+    Turn a run_ocr() result into the handle_ocr JSON payload and status
+    code. `analysis` is an analyze_disease() result, computed if not given.
+    """
+    text = ocr["text"]
+
+    if report_supported(disease_key):
+        result, threshold = analysis or analyze_disease(text, disease_key)
+        meds = get_medicine_for_disease(disease_key)
+
+        # ✅ FILTER matched only (non-None values)
+        filtered_thresholds = {
+            k: v for k, v in threshold["details"].items()
+            if v.get("value") is not None
+        }
+
+        return {
+            "threshold_status": threshold["status"],
+            "matched_parameters": {
+                k: v["value"] for k, v in filtered_thresholds.items()
+                if v["status"] in ["positive", "abnormal"]
+            },
+            "severity": result["severity"],
+            "final_decision": threshold["recommendation"],
+            "recommendations": threshold["possible_treatments"],
+            "medicines": meds,
+            "model_version": result["model_version"],
+            "ocr_stats": {
+                "pages": ocr["pages"],
+                "pages_total": ocr["pages_total"],
+                "stopped_early": ocr["stopped_early"],
+                "workers": ocr["workers"],
+                "preprocess": ocr["preprocess"],
+                "seconds": ocr["seconds"],
+                "cached": ocr["cached"]
+            }
+        }, 200
+
+    return {"error": "No result for selected disease"}, 404
+
+
 @csrf_exempt
 @csrf_exempt
 @csrf_exempt
@@ -708,33 +456,148 @@ def handle_ocr(request):
         if not file or not disease_key:
             return JsonResponse({'error': 'Missing file or disease name'}, status=400)
 
-        text = extract_text_from_any_file(file)
-        all_results = predict_disease(text)
+        ocr = run_ocr(file, stop_when=report_stop_condition(disease_key))
+        payload, status_code = build_ocr_response(ocr, disease_key)
+        return JsonResponse(payload, status=status_code)
 
-        if disease_key in all_results:
-            result = all_results[disease_key]
-            threshold = check_report_status(text, disease_key)
-            meds = get_medicine_for_disease(disease_key)
+    return JsonResponse({"error": "Invalid method"}, status=405)
 
-            # ✅ FILTER matched only (non-None values)
-            filtered_thresholds = {
-                k: v for k, v in threshold["details"].items()
-                if v.get("value") is not None
-            }
 
-            return JsonResponse({
-                "threshold_status": threshold["status"],
-                "matched_parameters": {
-                    k: v["value"] for k, v in filtered_thresholds.items()
-                    if v["status"] in ["positive", "abnormal"]
-                },
-                "severity": result["severity"],
-                "final_decision": threshold["recommendation"],
-                "recommendations": threshold["possible_treatments"],
-                "medicines": meds
-            })
+@csrf_exempt
+def submit_ocr(request):
+    if request.method == 'POST':
+        file = request.FILES.get('health_file')
+        disease_key = request.POST.get('target_disease', '').lower()
+
+        if not file or not disease_key:
+            return JsonResponse({'error': 'Missing file or disease name'}, status=400)
+
+        job = submit_ocr_job(file, disease_key)
+        return JsonResponse({
+            "job_id": str(job.pk),
+            "status": job.status,
+            "status_url": f"/api/report/ocr/jobs/{job.pk}/"
+        }, status=202)
+
+    return JsonResponse({"error": "Invalid method"}, status=405)
+
+
+def batch_report_items(request):
+    """
+    (name, disease, source) per report of a batch request. `source` is an
+    uploaded file or an already extracted text.
+    """
+    if request.content_type == "application/json":
+        body = json.loads(request.body or b"{}")
+        if not isinstance(body, dict):
+            raise ValueError("JSON body must be an object")
+        texts = body.get("texts", [])
+        if not isinstance(texts, list):
+            raise ValueError("texts must be a list")
+
+        disease = str(body.get("target_disease", "")).lower()
+        items = []
+        for i, entry in enumerate(texts):
+            if isinstance(entry, dict) and isinstance(entry.get("text", ""), str):
+                items.append((str(entry.get("name", f"text-{i}")),
+                              str(entry.get("target_disease", disease)).lower(),
+                              entry.get("text", "")))
+            elif isinstance(entry, str):
+                items.append((f"text-{i}", disease, entry))
+            else:
+                raise ValueError(f"texts[{i}] must be a string or an object with a string text")
+        return items
+
+    disease = request.POST.get('target_disease', '').lower()
+    files = [(f.name, disease, f) for f in request.FILES.getlist('health_files')]
+    texts = [(f"text-{i}", disease, t) for i, t in enumerate(request.POST.getlist('texts'))]
+    return files + texts
+
+
+def analyze_batch_chunk(items, chunk):
+    """Result lines {index: line} for one chunk of (index, item) pairs."""
+    lines, ocrs = {}, {}
+
+    for index, (name, disease, source) in chunk:
+        if not report_supported(disease):
+            lines[index] = {"index": index, "name": name, "status": 404,
+                            "result": {"error": "No result for selected disease"}}
+            continue
+        try:
+            if isinstance(source, str):
+                ocrs[index] = text_result(source)
+            else:
+                ocrs[index] = run_ocr(source, stop_when=report_stop_condition(disease))
+        except Exception as e:
+            lines[index] = {"index": index, "name": name, "status": 500,
+                            "result": {"error": str(e)}}
+
+    by_disease = {}
+    for index, (name, disease, source) in chunk:
+        if index in ocrs:
+            by_disease.setdefault(disease, []).append(index)
+
+    for disease, indexes in by_disease.items():
+        analyses = analyze_reports([ocrs[i]["text"] for i in indexes], disease)
+        for index, analysis in zip(indexes, analyses):
+            payload, status_code = build_ocr_response(ocrs[index], disease, analysis)
+            lines[index] = {"index": index, "name": items[index][0],
+                            "status": status_code, "result": payload}
+    return lines
+
+
+def analyze_batch(items, release=None):
+    """
+    Yield one result line per report. Reports are processed in chunks of
+    BATCH_CHUNK_SIZE; within a chunk every disease is scored as one matrix.
+    The whole batch uses one model release, even while it streams.
+    """
+    chunk_size = getattr(settings, "BATCH_CHUNK_SIZE", 16)
+    release = release or current_release()
+
+    for start in range(0, len(items), chunk_size):
+        chunk = list(enumerate(items[start:start + chunk_size], start))
+        with use_release(release):
+            lines = analyze_batch_chunk(items, chunk)
 
-        return JsonResponse({"error": "No result for selected disease"}, status=404)
+        for index, _ in chunk:
+            yield json.dumps(lines[index]) + "\n"
+
+
+@csrf_exempt
+def handle_batch(request):
+    """
+    Analyze many reports in one request: multipart `health_files` and/or
+    `texts`, or a JSON body {"target_disease": ..., "texts": [...]} whose
+    texts are strings or {"text", "target_disease", "name"} objects. Results
+    stream back as NDJSON, one handle_ocr-shaped result per report.
+    """
+    if request.method == 'POST':
+        try:
+            items = batch_report_items(request)
+        except json.JSONDecodeError:
+            return JsonResponse({'error': 'Invalid JSON body'}, status=400)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        if not items:
+            return JsonResponse({'error': 'Missing files or texts'}, status=400)
+        if any(not disease for _, disease, _ in items):
+            return JsonResponse({'error': 'Missing disease name'}, status=400)
+
+        return StreamingHttpResponse(analyze_batch(items, current_release()), content_type="application/x-ndjson")
+
+    return JsonResponse({"error": "Invalid method"}, status=405)
+
+
+def ocr_job_status(request, job_id):
+    if request.method == 'GET':
+        try:
+            job = OcrJob.objects.get(pk=job_id)
+        except OcrJob.DoesNotExist:
+            return JsonResponse({"error": "Job not found"}, status=404)
+
+        return JsonResponse(job_status_payload(expire_stale_job(job)))
 
     return JsonResponse({"error": "Invalid method"}, status=405)
 
@@ -755,14 +618,18 @@ def handle_symptoms(request):
         if options:
             return JsonResponse({
                 "symptom_options": options,
-                "symptom_base": raw
+                "symptom_base": raw,
+                "clarify_session": create_session(raw, symptoms, dis_list, options)
             })
 
         elif dis_list:
-            top_disease = dis_list[0][0]
+            # Naive-Bayes ranking from dataset.csv, see services/symptom_ranker.py;
+            # the overlap ranking is the fallback for symptoms it doesn't know
+            ranked = get_symptom_ranker().rank(symptoms, k=5)
+            top_disease, top_probability = ranked[0] if ranked else (dis_list[0][0], None)
             threshold = check_report_status(raw, top_disease.lower())
             meds = get_medicine_for_disease(top_disease)
-            probability = "95%"  # placeholder
+            probability = f"{top_probability:.0%}" if top_probability is not None else "N/A"
             severity = determine_severity(threshold["details"])
 
             ai_analysis = build_ai_analysis(top_disease, probability, severity, threshold, meds)
@@ -780,6 +647,9 @@ def handle_symptoms(request):
 
             return JsonResponse({
                 "symptom_diseases": [top_disease],
+                "disease_probabilities": [
+                    {"disease": disease, "probability": round(p, 4)} for disease, p in ranked
+                ],
                 "medicines": meds,
                 "ai_analysis": ai_analysis
             })
@@ -794,11 +664,17 @@ def handle_clarification(request):
     if request.method == 'POST':
         base = request.POST.get('symptom_base', '')
         clarification = request.POST.get('clarification', '')
+        token = request.POST.get('clarify_session')
 
-        symptoms = get_disease_from_symptoms(base.split(','))
-        symptoms.append(clarification.strip())
-
-        dis_list, _ = clarify_disease(symptoms)
+        # Narrow the candidates handle_symptoms cached; recompute from
+        # symptom_base when the session is missing or expired
+        session = narrow_session(token, clarification) if token else None
+        if session is not None:
+            dis_list = session["candidates"]
+        else:
+            symptoms = get_disease_from_symptoms(base.split(','))
+            symptoms.append(clarification.strip())
+            dis_list, _ = clarify_disease(symptoms)
 
         if dis_list:
             top = dis_list[0][0]
@@ -818,6 +694,8 @@ def handle_side_effects(request):
         name = request.POST.get('medicine_name')
         if not name:
             return JsonResponse({"error": "Medicine name required"}, status=400)
+        if len(name) > MAX_NAME_LENGTH:
+            return JsonResponse({"error": f"Medicine name longer than {MAX_NAME_LENGTH} characters"}, status=400)
 
         effects = fetch_side_effects(name)
         return JsonResponse({"side_effects": effects})
@@ -833,14 +711,13 @@ def download_pdf(request):
         if not disease or not text:
             return JsonResponse({"error": "Missing data"}, status=400)
 
-        predictions = predict_disease(text)
-        if disease not in predictions:
+        if not report_supported(disease):
             return JsonResponse({"error": "Invalid disease"}, status=400)
 
-        result = predictions[disease]
-        thresholds = check_report_status(text, disease)
+        result, thresholds = analyze_disease(text, disease)
         meds = get_medicine_for_disease(disease)
 
+        from .services.pdf import generate_diagnosis_pdf
         return FileResponse(
             generate_diagnosis_pdf(
                 disease_name=disease,
@@ -856,8 +733,6 @@ def download_pdf(request):
 
     return JsonResponse({"error": "Invalid method"}, status=405)
 
-from django.views.decorators.csrf import csrf_exempt
-from django.http import JsonResponse
 
 @csrf_exempt
 @csrf_exempt
@@ -888,24 +763,44 @@ def handle_save_report(request):
     
     return JsonResponse({'message': 'Invalid request method'}, status=405)
 
+def suggest_symptoms(request):
+    """Autocomplete canonical symptom names: /api/symptoms/suggest/?q=skin&k=5"""
+    if request.method == 'GET':
+        query = request.GET.get('q', '')
+        try:
+            k = max(1, int(request.GET.get('k', 8)))
+        except ValueError:
+            return JsonResponse({"error": "k must be a number"}, status=400)
+
+        suggestions = get_catalog().trie.complete(query, k)
+        return JsonResponse({
+            "query": query,
+            "suggestions": [{"name": name, "diseases": count} for name, count in suggestions]
+        })
+
+    return JsonResponse({"error": "Invalid method"}, status=405)
+
+
+def symptom_list_etag(request, *args, **kwargs):
+    return get_catalog().version
+
+
 class SymptomListView(APIView):
+    # Cached per catalog version; the version doubles as the ETag, so
+    # clients sending If-None-Match get a 304 until the catalog changes
+    @method_decorator(condition(etag_func=symptom_list_etag))
     def get(self, request):
         print("✅ SymptomListView GET hit")
 
-        common_symptoms = []
-        unique_symptoms = []
+        return Response(get_catalog().list_payload)
 
-        for symptom in Symptom.objects.prefetch_related('diseases'):
-            count = symptom.diseases.count()
-            if count == 1:
-                unique_symptoms.append(symptom.name)
-            elif count >= 3:
-                common_symptoms.append(symptom.name)
 
-        return Response({
-            "common": sorted(common_symptoms),
-            "unique": sorted(unique_symptoms)
-        })
+class OcrCacheStatsView(APIView):
+    # Hit/miss/eviction counters of this worker's OCR cache
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(ocr_cache.cache_stats())
 
 def build_ai_analysis(disease, probability, severity, threshold, meds):
     medicines_text = "\n".join([
@@ -58,6 +58,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'ocr_app.middleware.ModelReleaseMiddleware',
 ]
 
 ROOT_URLCONF = 'ocr_project.urls'
@@ -91,6 +92,16 @@ DATABASES = {
     }
 }
 
+# Shared by every worker process (clarification sessions, see
+# ocr_app/services/clarification.py); the table is created by migration
+# ocr_app 0004 or `manage.py createcachetable`
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -162,4 +173,83 @@ SIMPLE_JWT = {
     "ROTATE_REFRESH_TOKENS": True,
     "BLACKLIST_AFTER_ROTATION": True,
     "AUTH_HEADER_TYPES": ("Bearer",),
-}
\ No newline at end of file
+}
+
+# OCR
+# Size of the per-process pool that OCRs PDF pages in parallel (1 = sequential).
+# Every gunicorn worker has its own pool, so the cores are split between them
+OCR_WORKERS = int(os.environ.get(
+    "OCR_WORKERS", max(1, (os.cpu_count() or 1) // int(os.environ.get("GUNICORN_WORKERS", 4)))
+))
+OCR_POOL_START_METHOD = os.environ.get("OCR_POOL_START_METHOD", "spawn")
+# Rasterize uploaded PDFs from a spooled temp file a window of pages at a
+# time instead of all at once; a window holds this many rendered pages
+OCR_STREAM_PDF = os.environ.get("OCR_STREAM_PDF", "1") == "1"
+OCR_STREAM_WINDOW = int(os.environ.get("OCR_STREAM_WINDOW", 2))
+OCR_PDF_DPI = int(os.environ.get("OCR_PDF_DPI", 200))
+# Content-addressed OCR result cache (in-process LRU + on-disk tier). The
+# disk tier holds report text, so it lives outside the source tree
+OCR_CACHE_ENABLED = os.environ.get("OCR_CACHE_ENABLED", "1") == "1"
+OCR_CACHE_DIR = os.environ.get("OCR_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "scan2heal", "ocr"))
+OCR_CACHE_MEMORY_BYTES = 32 * 1024 * 1024
+OCR_CACHE_DISK_BYTES = 512 * 1024 * 1024
+# Background OCR jobs (/api/report/ocr/jobs/) run on a local thread pool
+OCR_JOB_WORKERS = int(os.environ.get("OCR_JOB_WORKERS", 2))
+OCR_JOB_STALE_SECONDS = 600
+# Read the embedded text layer of digital PDFs (pdftotext) and only OCR
+# pages with fewer than OCR_TEXT_LAYER_MIN_CHARS letters/digits of text
+OCR_USE_TEXT_LAYER = os.environ.get("OCR_USE_TEXT_LAYER", "1") == "1"
+OCR_TEXT_LAYER_MIN_CHARS = 50
+# Pre-processing applied to uploaded photos before OCR, in order. Stages:
+# draft (JPEG reduced decode), downscale, grayscale, binarize, deskew
+OCR_PREPROCESS = ["draft", "downscale", "grayscale"]
+OCR_PREPROCESS_TARGET_DPI = 300
+# "tesserocr" keeps a loaded tesseract engine per worker (optional package),
+# "pytesseract" runs the CLI per page, "auto" prefers tesserocr when installed
+OCR_BACKEND = os.environ.get("OCR_BACKEND", "auto")
+# Stop OCRing a PDF once the leading pages contain every threshold
+# parameter of the requested disease under its first (preferred) alias
+OCR_EARLY_STOP = os.environ.get("OCR_EARLY_STOP", "1") == "1"
+
+# Disease models
+# Versioned artifacts written by `manage.py train_models`, loaded on first use
+MODEL_ARTIFACT_DIR = os.path.join(BASE_DIR, 'ocr_app', 'model_artifacts')
+# "numpy" scores with the packed LinearEngine, "sklearn" with model.predict
+MODEL_INFERENCE = os.environ.get("MODEL_INFERENCE", "numpy")
+# Reports per chunk of /api/report/batch/ (OCR + one scoring call per disease)
+BATCH_CHUNK_SIZE = int(os.environ.get("BATCH_CHUNK_SIZE", 16))
+# Drop models not used for this many seconds (0 keeps them loaded)
+MODEL_IDLE_SECONDS = int(os.environ.get("MODEL_IDLE_SECONDS", 0))
+# Workers re-read the active release (`manage.py model_release`) at most
+# this often, between requests
+MODEL_STORE_POLL_SECONDS = int(os.environ.get("MODEL_STORE_POLL_SECONDS", 5))
+
+# Symptom catalog
+# Derived symptom/medicine structures are rebuilt when the catalog tables
+# change; other processes' changes are noticed within this many seconds
+SYMPTOM_CATALOG_POLL_SECONDS = int(os.environ.get("SYMPTOM_CATALOG_POLL_SECONDS", 5))
+# Completions kept per prefix for /api/symptoms/suggest/
+SYMPTOM_SUGGEST_LIMIT = 10
+# Seconds a clarification session (handle_symptoms -> handle_clarification)
+# stays in the cache
+CLARIFY_SESSION_TTL = 600
+
+# Medicines returned per disease by get_medicine_for_disease
+MEDICINES_PER_DISEASE = 5
+
+# Side effect lookups (services/side_effects.py). The upstream is a dotted
+# path to a class with fetch(name); empty serves only what the store holds,
+# e.g. after `manage.py i_side_effects <label dump>`
+SIDE_EFFECTS_UPSTREAM = os.environ.get("SIDE_EFFECTS_UPSTREAM", "ocr_app.services.side_effects.OpenFDAUpstream")
+# Local openFDA label dump read by LabelDumpUpstream
+SIDE_EFFECTS_LABEL_DUMP = os.environ.get("SIDE_EFFECTS_LABEL_DUMP", "")
+# Seconds per upstream request; after a failure no worker calls the
+# upstream for SIDE_EFFECTS_BACKOFF_SECONDS (stored entries are served)
+SIDE_EFFECTS_TIMEOUT = 5
+SIDE_EFFECTS_BACKOFF_SECONDS = 60
+# Stored entries are fresh for SIDE_EFFECTS_TTL seconds (SIDE_EFFECTS_MISS_TTL
+# for drugs without a label), then served while refreshing in the background
+# up to SIDE_EFFECTS_STALE_TTL
+SIDE_EFFECTS_TTL = 7 * 24 * 3600
+SIDE_EFFECTS_MISS_TTL = 24 * 3600
+SIDE_EFFECTS_STALE_TTL = 30 * 24 * 3600